@@ -0,0 +1,53 @@
+from functools import wraps
+
+from django.urls import URLPattern
+
+from core.connections import database_sync_to_async
+
+ASYNC_VIEW_NAMES = (
+    'recipe-list',
+    'recipe-detail',
+    'user-subscriptions',
+    'ingredient-list',
+)
+
+
+def async_view(view):
+    """
+    Асинхронная версия представления DRF.
+
+    DRF 3.14 не поддерживает асинхронные представления, а в Django 3.2
+    нет асинхронного ORM и кэша, поэтому представление вместе с
+    рендерингом ответа выполняется в ограниченном пуле потоков
+    database_sync_to_async. Поток занят только на время работы с базой
+    и кэшем: чтение запроса и отправка ответа медленному клиенту
+    идут в цикле событий и не держат ни поток, ни воркер.
+    """
+    def render(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    render = database_sync_to_async(render)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await render(request, *args, **kwargs)
+
+    return wrapper
+
+
+def async_patterns(patterns, names=ASYNC_VIEW_NAMES):
+    """Заменяет представления маршрутов names асинхронными."""
+    return [
+        URLPattern(
+            pattern.pattern,
+            async_view(pattern.callback),
+            pattern.default_args,
+            pattern.name,
+        )
+        if isinstance(pattern, URLPattern) and pattern.name in names
+        else pattern
+        for pattern in patterns
+    ]
@@ -0,0 +1,136 @@
+import base64
+import binascii
+from tempfile import SpooledTemporaryFile
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from rest_framework import serializers
+
+from recipes.images import variant_name
+
+
+class RecipeImageField(serializers.Field):
+    """
+    Ссылка на уменьшенную копию картинки рецепта.
+
+    В карточках списка отдаётся вариант card, на странице рецепта — detail.
+    Пока копии не готовы, отдаётся исходная картинка.
+    """
+
+    def __init__(self, absolute=False, **kwargs):
+        self.absolute = absolute
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_size(self):
+        view = self.context.get('view')
+        if getattr(view, 'action', None) == 'retrieve':
+            return 'detail'
+        return 'card'
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        url = default_storage.url(variant_name(recipe, self.get_size()))
+        request = self.context.get('request')
+        if self.absolute and request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class StreamingImageField(serializers.FileField):
+    """
+    Картинка рецепта строкой base64 или файлом из multipart-запроса.
+
+    Строка base64 декодируется частями во временный файл, который
+    уходит на диск, когда становится больше FILE_UPLOAD_MAX_MEMORY_SIZE.
+    Размер файла проверяется по длине строки до декодирования, число
+    пикселей — по заголовку картинки до её полной загрузки.
+    """
+
+    default_error_messages = {
+        'invalid_image': 'Загрузите корректную картинку: строку base64 '
+                         'или файл.',
+        'invalid_format': 'Допустимые форматы картинки: {formats}.',
+        'too_large': 'Размер картинки больше {max_size} МБ.',
+        'too_many_pixels': 'В картинке больше {max_pixels} мегапикселей.',
+    }
+    FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+    CHUNK_SIZE = 256 * 1024
+
+    def __init__(self, max_size=None, max_pixels=None, **kwargs):
+        self.max_size = max_size or settings.RECIPE_IMAGE_MAX_SIZE
+        self.max_pixels = max_pixels or settings.RECIPE_IMAGE_MAX_PIXELS
+        super().__init__(**kwargs)
+
+    def check_size(self, size):
+        if size > self.max_size:
+            self.fail('too_large', max_size=self.max_size // 1024 // 1024)
+
+    def check_pixels(self, image):
+        width, height = image.size
+        if width * height > self.max_pixels:
+            self.fail(
+                'too_many_pixels', max_pixels=self.max_pixels // 1000000
+            )
+
+    def check_header(self, file):
+        """Проверяет размеры по заголовку, если он уже декодирован."""
+        from PIL import Image
+
+        file.seek(0)
+        try:
+            self.check_pixels(Image.open(file))
+        except (OSError, SyntaxError, Image.DecompressionBombError):
+            pass
+        file.seek(0, 2)
+
+    def decode(self, data):
+        start = data.find(';base64,', 0, 100)
+        start = 0 if start == -1 else start + len(';base64,')
+        size = (len(data) - start) // 4 * 3 - data[-2:].count('=')
+        self.check_size(size)
+        file = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        for position in range(start, len(data), self.CHUNK_SIZE):
+            try:
+                file.write(base64.b64decode(
+                    data[position:position + self.CHUNK_SIZE], validate=True
+                ))
+            except (binascii.Error, ValueError):
+                self.fail('invalid_image')
+            if position == start:
+                self.check_header(file)
+        return UploadedFile(file, name='image', size=file.tell())
+
+    def check_image(self, file):
+        """Проверяет картинку без загрузки пикселей и возвращает формат."""
+        from PIL import Image
+
+        file.seek(0)
+        try:
+            image = Image.open(file)
+            self.check_pixels(image)
+            image.verify()
+        except (OSError, SyntaxError, Image.DecompressionBombError):
+            self.fail('invalid_image')
+        finally:
+            file.seek(0)
+        if image.format not in self.FORMATS:
+            self.fail(
+                'invalid_format', formats=', '.join(self.FORMATS.values())
+            )
+        return self.FORMATS[image.format]
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = self.decode(data)
+        elif not isinstance(data, UploadedFile):
+            self.fail('invalid_image')
+        self.check_size(data.size)
+        data.name = f'{uuid4()}.{self.check_image(data)}'
+        return super().to_internal_value(data)
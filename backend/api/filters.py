@@ -1,21 +1,56 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Exists, F, Q, Value
 from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 
+from core import constants
+from recipes.autocomplete import ingredient_index
 from recipes.models import Recipe
+from recipes.search import TrigramWordSimilar, TrigramWordSimilarity
 
 
 class IngredientSearchFilter(SearchFilter):
-    """Фильтрация ингредиентов по названию."""
+    """
+    Фильтрация ингредиентов по названию.
+
+    Список ищется по индексу в памяти: сначала точные совпадения,
+    затем начинающиеся с name, затем содержащие name.
+    """
+
+    def get_limit(self, request):
+        limit = request.query_params.get('limit', None)
+        if not limit:
+            return None
+        if not limit.isdigit():
+            raise ValidationError(
+                {'limit': 'Значение limit должно быть целым '
+                          'неотрицательным числом.'}
+            )
+        return int(limit)
 
     def filter_queryset(self, request, queryset, view):
         name = request.query_params.get('name', None)
+        if name and view.action == 'list':
+            return ingredient_index.search(name, self.get_limit(request))
         if name:
             queryset = queryset.filter(name__istartswith=name)
         return queryset
 
 
+RECIPE_ORDERINGS = {
+    'popular': ('-favorites_count', '-pub_date'),
+    'newest': ('-pub_date',),
+    'quickest': ('cooking_time', '-pub_date'),
+}
+
+
 class RecipeFilter(filters.FilterSet):
-    """Фильтрация рецептов по тегам, автору, избранному и списку покупок."""
+    """
+    Фильтрация рецептов по тегам, автору, избранному, списку покупок
+    и времени приготовления, полнотекстовый поиск, сортировка
+    по популярности, новизне и времени приготовления.
+    """
 
     tags = filters.AllValuesMultipleFilter(
         field_name='tags__slug',
@@ -29,10 +64,29 @@ class RecipeFilter(filters.FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart',
     )
+    cooking_time_max = filters.NumberFilter(
+        field_name='cooking_time',
+        lookup_expr='lte',
+    )
+    search = filters.CharFilter(
+        method='filter_search',
+    )
+    ordering = filters.ChoiceFilter(
+        choices=tuple((name, name) for name in RECIPE_ORDERINGS),
+        method='filter_ordering',
+    )
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author',
+            'tags',
+            'is_favorited',
+            'is_in_shopping_cart',
+            'cooking_time_max',
+            'search',
+            'ordering',
+        )
 
     def filter_by_relation(self, queryset, relation, value):
         user = self.request.user
@@ -49,3 +103,29 @@ class RecipeFilter(filters.FilterSet):
         return self.filter_by_relation(
             queryset, 'users_shopping_cart_recipes', value
         )
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
+
+    def filter_search(self, queryset, name, value):
+        """
+        Ищет по поисковому вектору рецепта с сортировкой по ts_rank.
+        Если ничего не нашлось, например из-за опечатки, ищет рецепты,
+        в названии которых есть похожее слово. Оба поиска идут одним
+        запросом: похожие названия подходят, только если подзапрос
+        полнотекстового поиска пуст.
+        """
+        query = SearchQuery(
+            value, config=constants.SEARCH_CONFIG, search_type='websearch'
+        )
+        found = queryset.filter(search_vector=query)
+        return queryset.filter(
+            Q(search_vector=query)
+            | Q(
+                ~Exists(found.values('pk')),
+                TrigramWordSimilar(Value(value), F('name')),
+            )
+        ).annotate(
+            rank=SearchRank(F('search_vector'), query),
+            similarity=TrigramWordSimilarity(Value(value), F('name')),
+        ).order_by('-rank', '-similarity', '-pub_date')
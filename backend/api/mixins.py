@@ -0,0 +1,217 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.cache import make_key
+from recipes.snapshots import get_snapshots, set_snapshots
+
+
+class CachedResponseMixin:
+    """
+    Кэширование ответов list и retrieve.
+
+    В кэше хранятся готовые байты JSON для каждого пути и набора
+    параметров запроса. Ключ включает версию пространства имён
+    cache_namespace, поэтому смена версии делает старые ответы
+    недоступными. Ответ содержит ETag, и при совпадении If-None-Match
+    возвращается 304 без тела.
+
+    Если ответ зависит от пользователя, cache_anonymous_only = True
+    включает кэш только для анонимных запросов. Ответ для кэша
+    строится по основной базе: отставшая реплика не должна попасть
+    в кэш под новой версией.
+    """
+
+    cache_namespace = None
+    cache_timeout = None
+    cache_anonymous_only = False
+    filling_cache = False
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.filling_cache:
+            return queryset.using(DEFAULT_DB_ALIAS)
+        return queryset
+
+    def get_cache_query(self, request):
+        """
+        Параметры запроса в нормальной форме: с упорядоченными именами
+        и значениями. Пустые значения сохраняются: пустой cursor
+        переключает постраничный вывод на курсор.
+        """
+        return urlencode(
+            sorted(
+                (name, sorted(values))
+                for name, values in request.query_params.lists()
+            ),
+            doseq=True,
+        )
+
+    def get_cache_key(self, request):
+        return make_key(
+            self.cache_namespace,
+            'response',
+            request.get_host(),
+            request.path,
+            self.get_cache_query(request),
+        )
+
+    def should_cache(self, request):
+        if request.accepted_renderer.format != 'json':
+            return False
+        return not (
+            self.cache_anonymous_only and request.user.is_authenticated
+        )
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        if not self.should_cache(request):
+            return handler(request, *args, **kwargs)
+        renderer = request.accepted_renderer
+        key = self.get_cache_key(request)
+        cached = cache.get(key)
+        if cached is None:
+            self.filling_cache = True
+            try:
+                response = handler(request, *args, **kwargs)
+            finally:
+                self.filling_cache = False
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            if isinstance(response, Response):
+                content = renderer.render(
+                    response.data,
+                    request.accepted_media_type,
+                    self.get_renderer_context(),
+                )
+            else:
+                content = response.content
+            cached = (f'"{hashlib.sha1(content).hexdigest()}"', content)
+            cache.set(
+                key,
+                cached,
+                self.cache_timeout or settings.RESPONSE_CACHE_TIMEOUT,
+            )
+        etag, content = cached
+        if_none_match = parse_etags(
+            request.META.get('HTTP_IF_NONE_MATCH', '')
+        )
+        if etag in if_none_match or '*' in if_none_match:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type=renderer.media_type)
+        response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+
+class RecipeSnapshotMixin:
+    """
+    Ответы list и retrieve для анонимных пользователей, собранные
+    из готовых представлений рецептов.
+
+    Для анонимного пользователя представление рецепта не зависит
+    от запроса, поэтому оно хранится в кэше байтами JSON отдельно
+    для list и retrieve. Из базы выбирается только страница рецептов,
+    сериализуются лишь те из них, которых нет в кэше. Представления
+    строятся по основной базе, чтобы отставшая реплика не попала
+    в кэш надолго.
+    """
+
+    snapshot_fields = ('id', 'pub_date', 'cooking_time', 'favorites_count')
+
+    def use_snapshots(self, request):
+        return (request.accepted_renderer.format == 'json'
+                and not request.user.is_authenticated)
+
+    def render_snapshots(self, recipe_ids):
+        snapshots = get_snapshots(recipe_ids, self.action)
+        missing = [
+            recipe_id for recipe_id in recipe_ids
+            if recipe_id not in snapshots
+        ]
+        if missing:
+            recipes = self.get_queryset().using(DEFAULT_DB_ALIAS).filter(
+                pk__in=missing
+            )
+            renderer = self.request.accepted_renderer
+            rendered = {
+                recipe.pk: renderer.render(data)
+                for recipe, data in zip(
+                    recipes, self.get_serializer(recipes, many=True).data
+                )
+            }
+            set_snapshots(rendered, self.action)
+            snapshots.update(rendered)
+        return [
+            snapshots[recipe_id] for recipe_id in recipe_ids
+            if recipe_id in snapshots
+        ]
+
+    def snapshot_response(self, content):
+        return HttpResponse(
+            content, content_type=self.request.accepted_renderer.media_type
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_snapshots(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(
+            self.get_queryset().prefetch_related(None).only(
+                *self.snapshot_fields
+            )
+        )
+        page = self.paginate_queryset(queryset)
+        recipes = queryset if page is None else page
+        results = b'[' + b','.join(
+            self.render_snapshots([recipe.pk for recipe in recipes])
+        ) + b']'
+        if page is None:
+            return self.snapshot_response(results)
+        envelope = self.get_paginated_response(None).data
+        del envelope['results']
+        content = request.accepted_renderer.render(envelope)
+        return self.snapshot_response(
+            content[:-1] + b',"results":' + results + b'}'
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_snapshots(request):
+            return super().retrieve(request, *args, **kwargs)
+        recipe_id = int(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        snapshots = self.render_snapshots([recipe_id])
+        if not snapshots:
+            self.get_object()
+        return self.snapshot_response(snapshots[0])
+
+
+class MetricsMixin:
+    """
+    Отмечает для QueryMetricsMiddleware действие представления,
+    например RecipeViewSet.list, и время его работы.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            metrics.start_view()
+        super().initial(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            metrics.finish_view(f'{self.__class__.__name__}.{self.action}')
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -1,5 +1,231 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import b64decode, b64encode
+from datetime import datetime
+
+from django.conf import settings
+from django.core import exceptions
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.feed import get_feed_page
+
+
+class KeysetPagination(BasePagination):
+    """
+    Постраничный вывод по ключу сортировки, без COUNT(*) и OFFSET.
+
+    Курсор хранит значения всех полей ordering у крайней записи
+    страницы, и следующая страница выбирается сравнением кортежей,
+    как в FeedPagination. Последним полем всегда идёт id, поэтому
+    ключ уникален и ни одна запись не пропускается и не повторяется.
+    Поля должны быть неизменяемыми: если значение поменяется между
+    запросами, запись может перескочить через границу страницы.
+    """
+
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    ordering = ('-id',)
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_ordering(self):
+        ordering = tuple(self.ordering)
+        if ordering[-1].lstrip('-') != 'id':
+            ordering += ('-id',)
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.REST_FRAMEWORK['PAGE_SIZE']
+        return max(page_size, 1)
+
+    def decode_cursor(self, request, fields):
+        """Направление и позиция курсора или (False, None) для начала."""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return False, None
+        try:
+            direction, *values = b64decode(
+                cursor.encode(), validate=True
+            ).decode().split('|')
+            if direction not in ('n', 'p') or len(values) != len(fields):
+                raise ValueError
+            return direction == 'p', tuple(
+                field.to_python(value)
+                for field, value in zip(fields, values)
+            )
+        except (ValueError, exceptions.ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, record, reverse):
+        values = (
+            str(getattr(record, name.lstrip('-'))) for name in self.keys
+        )
+        cursor = b64encode(
+            '|'.join(('p' if reverse else 'n', *values)).encode()
+        )
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            cursor.decode(),
+        )
+
+    @staticmethod
+    def after(ordering, position):
+        """
+        Условие «строго после position» при сортировке ordering:
+        (a, b) > (x, y) раскрывается в a > x OR (a = x AND b > y).
+        """
+        condition = Q()
+        for index, name in enumerate(ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= Q(
+                **{
+                    previous.lstrip('-'): value
+                    for previous, value in zip(ordering[:index], position)
+                },
+                **{f'{field}__{lookup}': position[index]},
+            )
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.keys = self.get_ordering()
+        fields = [
+            queryset.model._meta.get_field(name.lstrip('-'))
+            for name in self.keys
+        ]
+        page_size = self.get_page_size(request)
+        reverse, position = self.decode_cursor(request, fields)
+        ordering = self.keys
+        if reverse:
+            ordering = tuple(
+                name[1:] if name.startswith('-') else f'-{name}'
+                for name in ordering
+            )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+        page = list(queryset[:page_size + 1])
+        has_more = len(page) > page_size
+        page = page[:page_size]
+        if reverse:
+            page.reverse()
+        has_next = position is not None if reverse else has_more
+        has_previous = has_more if reverse else position is not None
+        self.next = (
+            self.encode_cursor(page[-1], False)
+            if page and has_next else None
+        )
+        self.previous = (
+            self.encode_cursor(page[0], True)
+            if page and has_previous else None
+        )
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next,
+            'previous': self.previous,
+            'results': data,
+        })
 
 
 class Pagination(PageNumberPagination):
+    """
+    Постраничный вывод по номеру страницы.
+
+    Если в запросе передан параметр cursor (в том числе пустой)
+    и выводится QuerySet, используется постраничный вывод по ключу
+    с сортировкой cursor_ordering представления. Представление
+    возвращает None вместо сортировки, если записи упорядочены
+    по изменяемым полям и курсор невозможен.
+    """
+
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    cursor_unavailable_message = (
+        'Курсор доступен только при сортировке по новизне.'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (self.cursor_query_param not in request.query_params
+                or not hasattr(queryset, 'order_by')):
+            return super().paginate_queryset(queryset, request, view)
+        ordering = getattr(view, 'cursor_ordering', KeysetPagination.ordering)
+        if ordering is None:
+            raise ValidationError(
+                {self.cursor_query_param: self.cursor_unavailable_message}
+            )
+        self.keyset = KeysetPagination()
+        self.keyset.ordering = ordering
+        return self.keyset.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class FeedPagination(BasePagination):
+    """
+    Постраничный вывод ленты подписок по позиции (pub_date, id)
+    последнего рецепта страницы.
+    """
+
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.REST_FRAMEWORK['PAGE_SIZE']
+        return min(max(page_size, 1), settings.FEED_HEAD_SIZE)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            pub_date, recipe_id = b64decode(
+                cursor.encode(), validate=True
+            ).decode().split('|')
+            return datetime.fromisoformat(pub_date), int(recipe_id)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        pub_date, recipe_id = position
+        cursor = b64encode(f'{pub_date.isoformat()}|{recipe_id}'.encode())
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            cursor.decode(),
+        )
+
+    def paginate_feed(self, request, user_id):
+        """id рецептов страницы ленты пользователя."""
+        self.request = request
+        page_size = self.get_page_size(request)
+        page = get_feed_page(
+            user_id, self.decode_cursor(request), page_size
+        )
+        self.next = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next = self.encode_cursor(page[-1])
+        return [recipe_id for _, recipe_id in page]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next,
+            'previous': None,
+            'results': data,
+        })
@@ -0,0 +1,27 @@
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+
+class MultiPartJSONParser(MultiPartParser):
+    """
+    Multipart-запрос с картинкой файлом и остальными полями в JSON.
+
+    Вложенные поля рецепта (теги, ингредиенты) передаются JSON-объектом
+    в части data, простые поля можно передать и отдельными частями.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parsed = super().parse(stream, media_type, parser_context)
+        data = parsed.data.dict()
+        payload = data.pop('data', None)
+        if payload:
+            try:
+                payload = json.loads(payload)
+            except ValueError as error:
+                raise ParseError(f'JSON parse error - {error}')
+            if not isinstance(payload, dict):
+                raise ParseError('Часть data должна быть JSON-объектом.')
+            data.update(payload)
+        return DataAndFiles(data, parsed.files.dict())
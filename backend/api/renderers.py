@@ -0,0 +1,316 @@
+import csv
+import json
+import os
+import textwrap
+import zlib
+from functools import lru_cache
+
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer
+
+SHOPPING_LIST_TITLE = 'Список покупок'
+SHOPPING_LIST_HEADER = ('Ингредиент', 'Единица измерения', 'Количество')
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """
+    Базовый рендерер списка покупок.
+
+    Строки списка отдаются потоком через stream(), render() используется
+    только для ответов с ошибками. По умолчанию stream() выводит каждый
+    ингредиент строкой текста.
+    """
+
+    charset = 'utf-8'
+    filename = 'shopping-list'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if renderer_context and 'response' in renderer_context:
+            renderer_context['response']['Content-Type'] = (
+                'application/json; charset=utf-8'
+            )
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+    @property
+    def content_type(self):
+        if self.charset:
+            return f'{self.media_type}; charset={self.charset}'
+        return self.media_type
+
+    @property
+    def content_disposition(self):
+        return f'attachment; filename={self.filename}.{self.format}'
+
+    def format_line(self, ingredient):
+        return (f'• {ingredient["name"]} '
+                f'({ingredient["measurement_unit"]}) - '
+                f'{ingredient["amount"]}')
+
+    def stream(self, ingredients):
+        for ingredient in ingredients:
+            yield self.format_line(ingredient) + '\n'
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class Echo:
+    """Файлоподобный объект, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(SHOPPING_LIST_HEADER)
+        for ingredient in ingredients:
+            yield writer.writerow((
+                ingredient['name'],
+                ingredient['measurement_unit'],
+                ingredient['amount'],
+            ))
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, ingredients):
+        separator = '['
+        for ingredient in ingredients:
+            yield separator + json.dumps(ingredient, ensure_ascii=False)
+            separator = ','
+        yield ']' if separator == ',' else '[]'
+
+
+PDF_FIRST_CHAR = 32
+PDF_CHARACTERS = bytes(range(PDF_FIRST_CHAR, 256)).decode(
+    'cp1251', errors='replace'
+)
+
+
+@lru_cache(maxsize=None)
+def load_pdf_font(path):
+    """
+    Читает TrueType-шрифт для встраивания в PDF и ширины глифов
+    кодировки cp1251. Возвращает None, если файла шрифта нет.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    from PIL import ImageFont
+
+    font = ImageFont.truetype(path, 1000)
+    ascent, descent = font.getmetrics()
+    widths = [round(font.getlength(char)) for char in PDF_CHARACTERS]
+    with open(path, 'rb') as font_file:
+        data = font_file.read()
+    return {
+        'data': zlib.compress(data),
+        'length': len(data),
+        'ascent': ascent,
+        'descent': -descent,
+        'bbox': (0, -descent, max(widths), ascent),
+        'widths': widths,
+    }
+
+
+class StreamingPDF:
+    """
+    Минимальный генератор PDF, который отдаёт документ по частям.
+
+    Каждая страница записывается, как только заполнена, а дерево страниц
+    и таблица ссылок дописываются в конце. Кириллица выводится простым
+    шрифтом в кодировке cp1251 с именами глифов uniXXXX; если задан файл
+    TrueType-шрифта, он встраивается в документ.
+    """
+
+    PAGE_WIDTH = 595
+    PAGE_HEIGHT = 842
+    MARGIN = 50
+    FONT_SIZE = 12
+    TITLE_FONT_SIZE = 16
+    LEADING = 16
+    LINE_WIDTH = 70
+
+    CATALOG, PAGES, FONT, FONT_DESCRIPTOR, FONT_FILE, TO_UNICODE = range(1, 7)
+
+    def __init__(self, font=None):
+        self.font = font
+        self.position = 0
+        self.offsets = {}
+        self.pages = []
+        self.next_number = self.TO_UNICODE + 1
+        self.lines_per_page = (
+            (self.PAGE_HEIGHT - 2 * self.MARGIN) // self.LEADING
+        )
+
+    def write(self, data):
+        self.position += len(data)
+        return data
+
+    def object(self, number, body):
+        self.offsets[number] = self.position
+        return self.write(b'%d 0 obj\n%s\nendobj\n' % (number, body))
+
+    def stream_object(self, number, data, extra=b''):
+        return self.object(
+            number,
+            b'<< /Length %d /Filter /FlateDecode%s >>\nstream\n%s\nendstream'
+            % (len(data), extra, data)
+        )
+
+    def header(self):
+        return self.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def font_objects(self):
+        differences = b' '.join(
+            b'/uni%04X' % ord(char) for char in PDF_CHARACTERS
+        )
+        encoding = b'<< /Type /Encoding /Differences [%d %s] >>' % (
+            PDF_FIRST_CHAR, differences
+        )
+        yield self.to_unicode()
+        if self.font is None:
+            yield self.object(
+                self.FONT,
+                b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+                b'/Encoding %s /ToUnicode %d 0 R >>'
+                % (encoding, self.TO_UNICODE)
+            )
+            return
+        widths = b' '.join(b'%d' % width for width in self.font['widths'])
+        yield self.object(
+            self.FONT,
+            b'<< /Type /Font /Subtype /TrueType /BaseFont /ShoppingListFont '
+            b'/FirstChar %d /LastChar 255 /Widths [%s] '
+            b'/FontDescriptor %d 0 R /Encoding %s /ToUnicode %d 0 R >>'
+            % (PDF_FIRST_CHAR, widths, self.FONT_DESCRIPTOR, encoding,
+               self.TO_UNICODE)
+        )
+        yield self.object(
+            self.FONT_DESCRIPTOR,
+            b'<< /Type /FontDescriptor /FontName /ShoppingListFont /Flags 32 '
+            b'/FontBBox [%d %d %d %d] /ItalicAngle 0 /Ascent %d /Descent %d '
+            b'/CapHeight %d /StemV 80 /FontFile2 %d 0 R >>'
+            % (*self.font['bbox'], self.font['ascent'], self.font['descent'],
+               self.font['ascent'], self.FONT_FILE)
+        )
+        yield self.stream_object(
+            self.FONT_FILE,
+            self.font['data'],
+            b' /Length1 %d' % self.font['length'],
+        )
+
+    def to_unicode(self):
+        codes = list(enumerate(PDF_CHARACTERS, PDF_FIRST_CHAR))
+        blocks = b'\n'.join(
+            b'%d beginbfchar\n%s\nendbfchar' % (
+                len(codes[start:start + 100]),
+                b'\n'.join(
+                    b'<%02X> <%04X>' % (code, ord(char))
+                    for code, char in codes[start:start + 100]
+                ),
+            )
+            for start in range(0, len(codes), 100)
+        )
+        cmap = (
+            b'/CIDInit /ProcSet findresource begin 12 dict begin begincmap\n'
+            b'/CMapName /ShoppingList-UCS def /CMapType 2 def\n'
+            b'1 begincodespacerange <00> <FF> endcodespacerange\n'
+            b'%s\n'
+            b'endcmap CMapName currentdict /CMap defineresource pop end end'
+            % blocks
+        )
+        return self.stream_object(self.TO_UNICODE, zlib.compress(cmap))
+
+    def text(self, line):
+        encoded = line.encode('cp1251', errors='replace').hex().encode()
+        return b'<%s> Tj' % encoded
+
+    def page(self, lines, title=None):
+        content = [
+            b'BT',
+            b'%d %d Td' % (self.MARGIN, self.PAGE_HEIGHT - self.MARGIN),
+        ]
+        if title:
+            content += [
+                b'/F1 %d Tf' % self.TITLE_FONT_SIZE,
+                self.text(title),
+                b'0 %d Td' % (-2 * self.LEADING),
+            ]
+        content.append(b'/F1 %d Tf %d TL' % (self.FONT_SIZE, self.LEADING))
+        for line in lines:
+            content += [self.text(line), b'T*']
+        content.append(b'ET')
+        page_number, content_number = self.next_number, self.next_number + 1
+        self.next_number += 2
+        self.pages.append(page_number)
+        yield self.stream_object(
+            content_number, zlib.compress(b'\n'.join(content))
+        )
+        yield self.object(
+            page_number,
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>'
+            % (self.PAGES, self.PAGE_WIDTH, self.PAGE_HEIGHT, self.FONT,
+               content_number)
+        )
+
+    def footer(self):
+        kids = b' '.join(b'%d 0 R' % number for number in self.pages)
+        yield self.object(
+            self.PAGES,
+            b'<< /Type /Pages /Kids [%s] /Count %d >>'
+            % (kids, len(self.pages))
+        )
+        yield self.object(
+            self.CATALOG,
+            b'<< /Type /Catalog /Pages %d 0 R >>' % self.PAGES
+        )
+        xref_position = self.position
+        size = max(self.offsets) + 1
+        entries = [b'0000000000 65535 f \n'] + [
+            b'%010d 00000 n \n' % self.offsets[number]
+            if number in self.offsets else b'0000000000 65535 f \n'
+            for number in range(1, size)
+        ]
+        yield self.write(
+            b'xref\n0 %d\n%s' % (size, b''.join(entries))
+            + b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+            % (size, self.CATALOG, xref_position)
+        )
+
+    def generate(self, title, lines):
+        yield self.header()
+        yield from self.font_objects()
+        page_title, page_lines = title, []
+        page_size = self.lines_per_page - 2
+        for line in lines:
+            for part in textwrap.wrap(line, self.LINE_WIDTH) or ('',):
+                page_lines.append(part)
+                if len(page_lines) == page_size:
+                    yield from self.page(page_lines, page_title)
+                    page_title, page_lines = None, []
+                    page_size = self.lines_per_page
+        if page_lines or not self.pages:
+            yield from self.page(page_lines, page_title)
+        yield from self.footer()
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    def stream(self, ingredients):
+        lines = (self.format_line(ingredient) for ingredient in ingredients)
+        return StreamingPDF(
+            load_pdf_font(settings.SHOPPING_LIST_FONT)
+        ).generate(SHOPPING_LIST_TITLE, lines)
@@ -1,12 +1,19 @@
-from drf_extra_fields.fields import Base64ImageField
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
+from recipes.images import variant_urls
+from recipes.matching import recipe_matcher
 from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.relations import UserRelations
+from recipes.snapshots import drop_snapshots
 from users.models import User
+from .fields import RecipeImageField, StreamingImageField
 from .validators import (validate_amount, validate_cooking_time,
-                         validate_image, validate_subscription,
-                         validate_tags_ingredients)
+                         validate_image, validate_recipes_limit,
+                         validate_subscription, validate_tags_ingredients)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -28,6 +35,8 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
         return (user.is_authenticated
                 and obj.subscribing.filter(user=user).exists())
@@ -36,12 +45,24 @@ class UserSerializer(serializers.ModelSerializer):
 class SmallRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор вывода нескольких полей рецепта."""
 
+    image = RecipeImageField(absolute=True)
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
         read_only_fields = fields
 
 
+class SimilarRecipeSerializer(SmallRecipeSerializer):
+    """Сериализатор похожего рецепта."""
+
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(SmallRecipeSerializer.Meta):
+        fields = SmallRecipeSerializer.Meta.fields + ('score',)
+        read_only_fields = fields
+
+
 class SubscriptionSerializer(UserSerializer):
     """Сериализатор подписки."""
 
@@ -60,16 +81,14 @@ class SubscriptionSerializer(UserSerializer):
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        recipes_limit = request.GET.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if recipes_limit:
-            try:
-                recipes_limit = int(recipes_limit)
-            except ValueError:
-                raise ValueError(
-                    'Значение recipes_limit должно быть целым числом.'
-                )
-            recipes = recipes[:recipes_limit]
+        recipes = getattr(obj, 'feed_recipes', None)
+        if recipes is None:
+            recipes_limit = validate_recipes_limit(
+                request.GET.get('recipes_limit')
+            )
+            recipes = obj.recipes.all()
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         return SmallRecipeSerializer(
             recipes,
             many=True,
@@ -77,7 +96,7 @@ class SubscriptionSerializer(UserSerializer):
         ).data
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -132,7 +151,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
-    image = serializers.SerializerMethodField()
+    image = RecipeImageField()
+    image_variants = serializers.SerializerMethodField()
     cooking_time = serializers.IntegerField(
         validators=(validate_cooking_time,),
     )
@@ -148,23 +168,40 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
 
-    def has_user_relation(self, obj, relation):
-        user = self.context.get('request').user
-        return user.is_authenticated and relation.filter(id=user.id).exists()
+    def get_relations(self):
+        """Множества id рецептов пользователя, общие для всей страницы."""
+        if 'relations' not in self.context:
+            self.context['relations'] = UserRelations(
+                self.context.get('request').user
+            )
+        return self.context['relations']
 
     def get_is_favorited(self, obj):
-        return self.has_user_relation(self, obj.users_favorite_recipes)
+        return obj.pk in self.get_relations().favorites
 
     def get_is_in_shopping_cart(self, obj):
-        return self.has_user_relation(self, obj.users_shopping_cart_recipes)
+        return obj.pk in self.get_relations().shopping_cart
 
-    def get_image(self, obj):
-        if obj.image:
-            return obj.image.url
+    def get_image_variants(self, obj):
+        return variant_urls(obj)
+
+
+class RecipeMatchSerializer(RecipeSerializer):
+    """Сериализатор рецепта, подобранного по имеющимся ингредиентам."""
+
+    missing_count = serializers.IntegerField(read_only=True)
+    match_score = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + (
+            'missing_count',
+            'match_score',
+        )
 
 
 class RecipeCreateSerializer(RecipeSerializer):
@@ -174,7 +211,7 @@ class RecipeCreateSerializer(RecipeSerializer):
         many=True,
         queryset=Tag.objects.all(),
     )
-    image = Base64ImageField(
+    image = StreamingImageField(
         required=True,
         validators=(validate_image,),
     )
@@ -194,26 +231,61 @@ class RecipeCreateSerializer(RecipeSerializer):
         return validate_tags_ingredients(self, data)
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            (instance,),
+            'tags',
+            Prefetch(
+                'ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient'),
+            ),
+        )
         representation = super().to_representation(instance)
         representation['tags'] = TagSerializer(
-            Tag.objects.filter(
-                id__in=instance.tags.all().values_list('id', flat=True)
-            ),
-            many=True,
+            instance.tags.all(), many=True
         ).data
         return representation
 
     def add_ingredients(self, ingredients_data, recipe):
         RecipeIngredient.objects.bulk_create(
-            [RecipeIngredient(
+            RecipeIngredient(
                 recipe=recipe,
-                ingredient=Ingredient.objects.get(
-                    id=ingredient_data['ingredient']['id']
-                ),
-                amount=ingredient_data['amount']
-            ) for ingredient_data in ingredients_data]
+                ingredient=ingredient_data['ingredient'],
+                amount=ingredient_data['amount'],
+            ) for ingredient_data in ingredients_data
         )
 
+    def update_ingredients(self, ingredients_data, recipe):
+        """
+        Меняет только отличающиеся строки ингредиентов рецепта:
+        удаляет лишние, обновляет количество и добавляет новые.
+        """
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in RecipeIngredient.objects.filter(
+                recipe=recipe
+            )
+        }
+        changed, added = [], []
+        for ingredient_data in ingredients_data:
+            recipe_ingredient = current.pop(
+                ingredient_data['ingredient'].pk, None
+            )
+            if recipe_ingredient is None:
+                added.append(ingredient_data)
+            elif recipe_ingredient.amount != ingredient_data['amount']:
+                recipe_ingredient.amount = ingredient_data['amount']
+                changed.append(recipe_ingredient)
+        if current:
+            RecipeIngredient.objects.filter(
+                pk__in=[row.pk for row in current.values()]
+            ).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        if added:
+            self.add_ingredients(added, recipe)
+        return bool(current or changed or added)
+
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context.get('request').user
         tags = validated_data.pop('tags')
@@ -221,8 +293,12 @@ class RecipeCreateSerializer(RecipeSerializer):
         recipe = Recipe.objects.create(author=author, **validated_data)
         recipe.tags.set(tags)
         self.add_ingredients(ingredients, recipe)
+        Recipe.objects.filter(pk=recipe.pk).update_search_vector()
+        recipe_matcher.changed(recipe.pk)
+        drop_snapshots([recipe.pk])
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         instance.name = validated_data.get('name', instance.name)
         instance.cooking_time = validated_data.get(
@@ -230,10 +306,26 @@ class RecipeCreateSerializer(RecipeSerializer):
         )
         instance.text = validated_data.get('text', instance.text)
         instance.image = validated_data.get('image', instance.image)
-        ingredients_data = validated_data.pop('ingredients')
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        self.add_ingredients(ingredients_data, instance)
-        tags = validated_data.pop('tags')
-        instance.tags.set(tags)
+        ingredients = validated_data.pop('ingredients')
+        if self.update_ingredients(ingredients, instance):
+            recipe_matcher.changed(instance.pk)
+        instance.tags.set(validated_data.pop('tags'))
+        instance.similar_outdated = True
         instance.save()
         return instance
+
+
+class BulkChangeSerializer(serializers.Serializer):
+    """Сериализатор пакетного добавления или удаления по списку id."""
+
+    op = serializers.ChoiceField(
+        choices=('add', 'remove'),
+    )
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_MAX_IDS,
+    )
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes.models import Ingredient
+
+
+class IngredientAutocompleteTests(TestCase):
+    """Поиск ингредиентов по началу и части названия."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г')
+            for name in (
+                'сахарная пудра',
+                'ванильный сахар',
+                'Сахар',
+                'сахар тростниковый',
+                'соль',
+            )
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, **params):
+        response = self.client.get('/api/ingredients/', params)
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.json()]
+
+    def test_exact_then_prefix_then_contains(self):
+        self.assertEqual(
+            self.search(name='сахар'),
+            ['Сахар', 'сахар тростниковый', 'сахарная пудра',
+             'ванильный сахар'],
+        )
+
+    def test_limit(self):
+        self.assertEqual(
+            self.search(name='САХАР', limit=2),
+            ['Сахар', 'сахар тростниковый'],
+        )
+        self.assertEqual(len(self.search(name='сахар', limit=4)), 4)
+
+    def test_invalid_limit(self):
+        response = self.client.get(
+            '/api/ingredients/', {'name': 'сахар', 'limit': '-1'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_new_ingredient_is_found_after_commit(self):
+        self.assertEqual(self.search(name='ванил'), ['ванильный сахар'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='ваниль', measurement_unit='г')
+        self.assertEqual(
+            self.search(name='ванил'), ['ваниль', 'ванильный сахар']
+        )
@@ -0,0 +1,125 @@
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Recipe
+from users.models import Subscription, User
+
+
+class SubscribeBulkTests(TestCase):
+    """Пакетная подписка на авторов и отписка от них."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.author, cls.other = (
+            User.objects.create_user(
+                email=f'{name}@example.com',
+                username=name,
+                first_name=name,
+                last_name=name,
+                password='password',
+            )
+            for name in ('reader', 'author', 'other')
+        )
+        Subscription.objects.create(user=cls.reader, author=cls.author)
+        cls.token = Token.objects.create(user=cls.reader)
+
+    def setUp(self):
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {self.token.key}'
+
+    def bulk(self, op, ids):
+        response = self.client.post(
+            '/api/users/subscribe/bulk/',
+            {'op': op, 'ids': ids},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return {
+            result['id']: result['status']
+            for result in response.json()['results']
+        }
+
+    def followers(self, user):
+        user.refresh_from_db(fields=('followers_count',))
+        return user.followers_count
+
+    def test_add_counts_only_new_subscriptions(self):
+        author_followers = self.followers(self.author)
+        missing = self.other.pk + 1
+        results = self.bulk(
+            'add', [self.author.pk, self.other.pk, self.reader.pk, missing]
+        )
+        self.assertEqual(results, {
+            self.author.pk: 'already_added',
+            self.other.pk: 'added',
+            self.reader.pk: 'self',
+            missing: 'not_found',
+        })
+        self.assertEqual(self.followers(self.author), author_followers)
+        self.assertEqual(self.followers(self.other), 1)
+        results = self.bulk('add', [self.other.pk])
+        self.assertEqual(results, {self.other.pk: 'already_added'})
+        self.assertEqual(self.followers(self.other), 1)
+
+    def test_remove(self):
+        results = self.bulk('remove', [self.author.pk, self.other.pk])
+        self.assertEqual(results, {
+            self.author.pk: 'removed',
+            self.other.pk: 'not_added',
+        })
+        self.assertFalse(Subscription.objects.filter(user=self.reader))
+
+
+class RecipeBulkChangeTests(TestCase):
+    """Пакетное добавление рецептов в избранное и удаление из него."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            email='reader@example.com',
+            username='reader',
+            first_name='reader',
+            last_name='reader',
+            password='password',
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.reader,
+                name=f'Рецепт {number}',
+                image='recipes/images/test.jpg',
+                text='Описание',
+                cooking_time=10,
+            )
+            for number in range(2)
+        ]
+        cls.reader.favorite_recipes.add(cls.recipes[0])
+        cls.token = Token.objects.create(user=cls.reader)
+
+    def setUp(self):
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {self.token.key}'
+
+    def bulk(self, op, ids):
+        response = self.client.post(
+            '/api/recipes/favorite/bulk/',
+            {'op': op, 'ids': ids},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return [result['status'] for result in response.json()['results']]
+
+    def favorites(self):
+        return [
+            recipe.favorites_count
+            for recipe in Recipe.objects.filter(
+                pk__in=[recipe.pk for recipe in self.recipes]
+            ).order_by('pk')
+        ]
+
+    def test_add_and_remove(self):
+        ids = [recipe.pk for recipe in self.recipes]
+        self.assertEqual(self.bulk('add', ids), ['already_added', 'added'])
+        self.assertEqual(self.favorites(), [1, 1])
+        self.assertEqual(self.bulk('add', ids), ['already_added'] * 2)
+        self.assertEqual(self.favorites(), [1, 1])
+        self.assertEqual(self.bulk('remove', ids), ['removed'] * 2)
+        self.assertEqual(self.bulk('remove', ids), ['not_added'] * 2)
+        self.assertEqual(self.favorites(), [0, 0])
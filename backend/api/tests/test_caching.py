@@ -0,0 +1,30 @@
+from django.core.cache import cache
+from django.test import Client, TransactionTestCase
+
+from .test_query_budgets import create_data
+
+
+class ResponseCacheTests(TransactionTestCase):
+    """
+    Кэш ответов сбрасывается после фиксации изменений, поэтому тест
+    не может идти внутри транзакции TestCase.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.recipes, _ = create_data()
+
+    def author_names(self):
+        response = Client().get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return {
+            recipe['author']['first_name']
+            for recipe in response.json()['results']
+        }
+
+    def test_author_rename_refreshes_recipe_list(self):
+        self.assertEqual(self.author_names(), {'author'})
+        author = self.recipes[0].author
+        author.first_name = 'Новое имя'
+        author.save()
+        self.assertEqual(self.author_names(), {'Новое имя'})
@@ -0,0 +1,100 @@
+from django.test import TestCase
+
+from recipes.counters import count_subquery, get_counters
+from recipes.models import Recipe
+from users.models import Subscription, User
+
+
+class CountersTests(TestCase):
+    """Счётчики избранного, корзины, рецептов и подписчиков."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.user, cls.other = (
+            User.objects.create_user(
+                email=f'{username}@example.com',
+                username=username,
+                first_name='Имя',
+                last_name='Фамилия',
+                password='password',
+            )
+            for username in ('author', 'user', 'other')
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.author,
+                name=f'Рецепт {number}',
+                image='recipes/images/test.jpg',
+                text='Описание',
+                cooking_time=10,
+            )
+            for number in range(3)
+        ]
+
+    def assertCounters(self):
+        """Счётчики совпадают с пересчётом по связанным строкам."""
+        for model, field, queryset, relation in get_counters():
+            rows = model.objects.annotate(
+                actual=count_subquery(queryset, relation)
+            ).values_list('pk', field, 'actual')
+            for pk, stored, actual in rows:
+                self.assertEqual(stored, actual, (model.__name__, field, pk))
+
+    def get_counts(self, field):
+        return list(
+            Recipe.objects.order_by('pk').values_list(field, flat=True)
+        )
+
+    def test_favorites_add_remove_clear(self):
+        first, second, third = self.recipes
+        self.user.favorite_recipes.add(first, second)
+        self.user.favorite_recipes.add(first)
+        self.other.favorite_recipes.add(first)
+        self.assertEqual(self.get_counts('favorites_count'), [2, 1, 0])
+        self.user.favorite_recipes.remove(first, third)
+        self.assertEqual(self.get_counts('favorites_count'), [1, 1, 0])
+        first.users_favorite_recipes.add(self.user, self.author)
+        self.assertEqual(self.get_counts('favorites_count'), [3, 1, 0])
+        first.users_favorite_recipes.remove(self.other)
+        self.user.favorite_recipes.clear()
+        self.assertEqual(self.get_counts('favorites_count'), [1, 0, 0])
+        self.assertCounters()
+
+    def test_shopping_cart_add_remove_clear(self):
+        first, second, _ = self.recipes
+        self.user.shopping_cart_recipes.add(first, second)
+        self.other.shopping_cart_recipes.add(second)
+        self.assertEqual(self.get_counts('in_carts_count'), [1, 2, 0])
+        second.users_shopping_cart_recipes.clear()
+        self.assertEqual(self.get_counts('in_carts_count'), [1, 0, 0])
+        self.assertCounters()
+
+    def test_user_delete(self):
+        first, second, _ = self.recipes
+        self.user.favorite_recipes.add(first, second)
+        self.user.shopping_cart_recipes.add(first)
+        self.other.favorite_recipes.add(first)
+        Subscription.objects.create(user=self.user, author=self.author)
+        Subscription.objects.create(user=self.other, author=self.author)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 2)
+        self.user.delete()
+        self.assertEqual(self.get_counts('favorites_count'), [1, 0, 0])
+        self.assertEqual(self.get_counts('in_carts_count'), [0, 0, 0])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertCounters()
+
+    def test_recipe_delete(self):
+        self.user.favorite_recipes.add(*self.recipes)
+        self.recipes[0].delete()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 2)
+        self.assertCounters()
+
+    def test_author_delete(self):
+        self.user.favorite_recipes.add(*self.recipes)
+        Subscription.objects.create(user=self.author, author=self.other)
+        self.author.delete()
+        self.assertFalse(Recipe.objects.exists())
+        self.assertCounters()
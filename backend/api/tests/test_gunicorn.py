@@ -0,0 +1,52 @@
+import os
+import runpy
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+CONFIG = settings.BASE_DIR / 'gunicorn.conf.py'
+
+
+class GunicornConfigTests(SimpleTestCase):
+    """Настройки gunicorn из переменных окружения."""
+
+    def load(self, **environ):
+        names = [name for name in os.environ
+                 if name.startswith('GUNICORN_') or name == 'CACHE_BACKEND']
+        with mock.patch.dict(os.environ, environ):
+            for name in names:
+                if name not in environ:
+                    del os.environ[name]
+            return runpy.run_path(str(CONFIG))
+
+    def test_wsgi_by_default(self):
+        config = self.load(GUNICORN_WORKERS='3')
+        self.assertEqual(config['wsgi_app'], 'backend.wsgi:application')
+        self.assertEqual(config['worker_class'], 'gthread')
+        self.assertEqual(config['workers'], 3)
+        self.assertEqual(config['threads'], 4)
+        self.assertTrue(config['preload_app'])
+
+    def test_asgi(self):
+        config = self.load(GUNICORN_SERVER='asgi', GUNICORN_THREADS='8')
+        self.assertEqual(config['wsgi_app'], 'backend.asgi:application')
+        self.assertEqual(
+            config['worker_class'], 'uvicorn.workers.UvicornWorker'
+        )
+        self.assertEqual(config['threads'], 8)
+
+    def test_worker_class_override(self):
+        config = self.load(
+            GUNICORN_WORKER_CLASS='gevent', GUNICORN_PRELOAD='False'
+        )
+        self.assertEqual(config['worker_class'], 'gevent')
+        self.assertFalse(config['preload_app'])
+
+    def test_locmem_cache_with_several_workers(self):
+        with self.assertRaises(RuntimeError):
+            self.load(GUNICORN_WORKERS='2', CACHE_BACKEND='locmem')
+        config = self.load(GUNICORN_WORKERS='1', CACHE_BACKEND='locmem')
+        self.assertEqual(config['workers'], 1)
+        config = self.load(GUNICORN_WORKERS='2', CACHE_BACKEND='redis')
+        self.assertEqual(config['workers'], 2)
@@ -0,0 +1,81 @@
+import base64
+import io
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from api.fields import StreamingImageField
+
+
+def make_image(size=(30, 20), format='PNG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, format)
+    return buffer.getvalue()
+
+
+def encode(content, prefix='data:image/png;base64,'):
+    return prefix + base64.b64encode(content).decode()
+
+
+class StreamingImageFieldTests(SimpleTestCase):
+    """Проверка размера и числа пикселей загружаемой картинки."""
+
+    def setUp(self):
+        self.field = StreamingImageField(max_size=1024, max_pixels=10000)
+
+    def assertFails(self, data, code):
+        with self.assertRaises(ValidationError) as error:
+            self.field.to_internal_value(data)
+        self.assertEqual(error.exception.get_codes(), [code])
+
+    def test_base64(self):
+        content = make_image()
+        for data, extension in (
+            (encode(content), 'png'),
+            (encode(make_image(format='JPEG'), prefix=''), 'jpg'),
+        ):
+            with self.subTest(extension=extension):
+                file = self.field.to_internal_value(data)
+                self.assertTrue(file.name.endswith(f'.{extension}'))
+        self.assertEqual(
+            self.field.to_internal_value(encode(content)).read(), content
+        )
+
+    def test_multipart(self):
+        file = self.field.to_internal_value(
+            SimpleUploadedFile('image.gif', make_image(format='GIF'))
+        )
+        self.assertTrue(file.name.endswith('.gif'))
+
+    def test_size_is_checked_before_decoding(self):
+        self.assertFails('!' * 1400, 'too_large')
+        self.assertFails(encode(b'\0' * 1025), 'too_large')
+        self.assertFails(
+            SimpleUploadedFile('image.png', b'\0' * 1025), 'too_large'
+        )
+
+    def test_too_many_pixels(self):
+        content = make_image((200, 100))
+        self.assertFails(encode(content), 'too_many_pixels')
+        self.assertFails(
+            SimpleUploadedFile('image.png', content), 'too_many_pixels'
+        )
+
+    def test_pixels_are_checked_by_first_chunk(self):
+        self.field.max_size = 1024 * 1024
+        data = encode(make_image((200, 100)), prefix='')[:64] + '!' * 4000
+        with mock.patch.object(StreamingImageField, 'CHUNK_SIZE', 64):
+            self.assertFails(data, 'too_many_pixels')
+            self.assertFails(
+                encode(make_image(), prefix='')[:64] + '!' * 4000,
+                'invalid_image',
+            )
+
+    def test_invalid_image(self):
+        self.assertFails(encode(b'hello world!'), 'invalid_image')
+        self.assertFails('data:image/png;base64,!!!!', 'invalid_image')
+        self.assertFails(123, 'invalid_image')
+        self.assertFails(encode(make_image((10, 10), 'BMP')), 'invalid_format')
@@ -0,0 +1,61 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes.models import Recipe
+from users.models import User
+
+
+class ImageVariantsTests(TestCase):
+    """Ссылки на уменьшенные копии картинки рецепта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Автор',
+            last_name='Рецептов',
+            password='password',
+        )
+        cls.recipe = Recipe.objects.create(
+            author=author,
+            name='Рецепт',
+            image='recipes/images/test.jpg',
+            image_variants={
+                'source': 'recipes/images/test.jpg',
+                'detail': {
+                    'avif': 'recipes/images/variants/1_test_detail.avif',
+                    'jpeg': 'recipes/images/variants/1_test_detail.jpeg',
+                },
+            },
+            text='Описание',
+            cooking_time=10,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_recipe(self):
+        response = self.client.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_unsupported_format_is_not_advertised(self):
+        with mock.patch(
+            'recipes.images.SUPPORTED_FORMATS', frozenset({'jpeg'})
+        ):
+            recipe = self.get_recipe()
+        self.assertEqual(list(recipe['image_variants']['detail']), ['jpeg'])
+        self.assertTrue(recipe['image'].endswith('.jpeg'))
+
+    def test_supported_formats_are_listed(self):
+        with mock.patch(
+            'recipes.images.SUPPORTED_FORMATS', frozenset({'avif', 'jpeg'})
+        ):
+            recipe = self.get_recipe()
+        self.assertEqual(
+            set(recipe['image_variants']['detail']), {'avif', 'jpeg'}
+        )
+        self.assertTrue(recipe['image'].endswith('.avif'))
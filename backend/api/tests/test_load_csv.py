@@ -0,0 +1,63 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from recipes.models import Ingredient
+
+
+class LoadJSONTests(TestCase):
+    """Загрузка справочника из массива JSON по одной записи."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'ingredients.json')
+        self.missing = os.path.join(directory.name, 'tags.csv')
+
+    def load(self, content):
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        with mock.patch(
+            'recipes.management.commands.load_csv.JSON_CHUNK_SIZE', 5
+        ):
+            call_command(
+                'load_csv',
+                ingredients=self.path,
+                tags=self.missing,
+                batch_size=2,
+                stdout=StringIO(),
+            )
+
+    def test_array_is_read_in_chunks(self):
+        rows = [
+            {'name': f'Соль, "морская" [{number}]', 'measurement_unit': 'г'}
+            for number in range(5)
+        ]
+        self.load(json.dumps(rows, ensure_ascii=False, indent=2))
+        self.assertEqual(
+            list(Ingredient.objects.order_by('name').values(
+                'name', 'measurement_unit'
+            )),
+            rows,
+        )
+
+    def test_empty_array(self):
+        self.load(' [ ] ')
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_malformed_file(self):
+        for content in (
+            '{"name": "Соль"}',
+            '[{"name": "Соль", "measurement_unit": "г"}',
+            '[{"name": "Соль", "measurement_unit": "г"} {}]',
+            '[{"name": "Соль", "measurement_unit": "г"}] []',
+        ):
+            with self.subTest(content=content):
+                with self.assertRaises(CommandError):
+                    self.load(content)
+        self.assertFalse(Ingredient.objects.exists())
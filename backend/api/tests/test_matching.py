@@ -0,0 +1,114 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes.matching import recipe_matcher
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from users.models import User
+
+
+class RecipeMatchTests(TestCase):
+    """Подбор рецептов по имеющимся ингредиентам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Автор',
+            last_name='Рецептов',
+            password='password',
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г')
+            for name in ('мука', 'яйца', 'молоко', 'сахар')
+        )
+        flour, eggs, milk, sugar = cls.ingredients
+        cls.recipes = {}
+        for name, ingredients in (
+            ('лапша', (flour, eggs)),
+            ('блины', (flour, eggs, milk)),
+            ('лепёшка', (flour,)),
+            ('сладкое молоко', (milk, sugar)),
+            ('сироп', (sugar,)),
+        ):
+            recipe = Recipe.objects.create(
+                author=author,
+                name=name,
+                image='recipes/images/test.jpg',
+                text='Описание',
+                cooking_time=10,
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=1)
+                for ingredient in ingredients
+            )
+            cls.recipes[name] = recipe
+
+    def setUp(self):
+        cache.clear()
+
+    def match(self, *ingredients, **params):
+        response = self.client.get('/api/recipes/match/', dict(
+            params, have=','.join(str(ingredient.pk)
+                                  for ingredient in ingredients)
+        ))
+        self.assertEqual(response.status_code, 200)
+        return [
+            (recipe['name'], recipe['missing_count'], recipe['match_score'])
+            for recipe in response.json()['results']
+        ]
+
+    def test_ranking(self):
+        flour, eggs, _, _ = self.ingredients
+        self.assertEqual(self.match(flour, eggs), [
+            ('лапша', 0, 1.0),
+            ('лепёшка', 0, 0.5),
+            ('блины', 1, 0.6667),
+        ])
+
+    def test_max_missing(self):
+        flour, eggs, _, sugar = self.ingredients
+        self.assertEqual(
+            [name for name, _, _ in self.match(flour, eggs, max_missing=0)],
+            ['лапша', 'лепёшка'],
+        )
+        self.assertEqual(
+            self.match(sugar, max_missing=0), [('сироп', 0, 1.0)]
+        )
+
+    def test_changed_recipes_are_applied(self):
+        flour, eggs, _, sugar = self.ingredients
+        self.match(flour, eggs)
+        syrup = self.recipes['сироп']
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.filter(recipe=syrup).delete()
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=syrup, ingredient=ingredient,
+                                 amount=1)
+                for ingredient in (flour, eggs)
+            )
+            recipe_matcher.changed(syrup.pk)
+            self.recipes['лапша'].delete()
+        with mock.patch.object(
+            recipe_matcher, 'build', side_effect=AssertionError
+        ):
+            self.assertEqual(self.match(flour, eggs), [
+                ('сироп', 0, 1.0),
+                ('лепёшка', 0, 0.5),
+                ('блины', 1, 0.6667),
+            ])
+        self.assertEqual(self.match(sugar), [('сладкое молоко', 1, 0.5)])
+
+    def test_invalid_params(self):
+        for params in (
+            {'have': ''},
+            {'have': '1,a'},
+            {'have': '0'},
+            {'have': '1', 'max_missing': '-1'},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get('/api/recipes/match/', params)
+                self.assertEqual(response.status_code, 400)
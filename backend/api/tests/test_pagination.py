@@ -0,0 +1,79 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from recipes.models import Recipe
+from users.models import User
+
+
+class KeysetPaginationTests(TestCase):
+    """Постраничный вывод рецептов по курсору."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Автор',
+            last_name='Рецептов',
+            password='password',
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name=f'Рецепт {number}',
+                image='recipes/images/test.jpg',
+                text='Описание',
+                cooking_time=10,
+            )
+            for number in range(30)
+        )
+        Recipe.objects.update(pub_date=timezone.now())
+        cls.ids = list(
+            Recipe.objects.order_by('-id').values_list('id', flat=True)
+        )
+
+    def walk(self, url, link='next'):
+        pages = []
+        while url and len(pages) <= len(self.ids):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            pages.append([recipe['id'] for recipe in data['results']])
+            url = data[link]
+        return pages
+
+    def test_equal_pub_dates_are_walked_once(self):
+        pages = self.walk('/api/recipes/?limit=7&cursor=')
+        self.assertEqual(len(pages), 5)
+        self.assertEqual(sum(pages, []), self.ids)
+
+    def test_previous_returns_to_earlier_pages(self):
+        forward = self.walk('/api/recipes/?limit=7&cursor=')
+        last = self.client.get(
+            '/api/recipes/?limit=7&cursor='
+        ).json()
+        for _ in range(len(forward) - 1):
+            last = self.client.get(last['next']).json()
+        backward = self.walk(last['previous'], link='previous')
+        self.assertEqual(backward, forward[-2::-1])
+
+    def test_mutable_orderings_reject_cursor(self):
+        for ordering in ('popular', 'quickest'):
+            response = self.client.get(
+                '/api/recipes/', {'cursor': '', 'ordering': ordering}
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/recipes/', {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_is_not_served_from_page_number_cache(self):
+        self.client.get('/api/recipes/', {'limit': 3})
+        data = self.client.get(
+            '/api/recipes/', {'limit': 3, 'cursor': ''}
+        ).json()
+        self.assertNotIn('count', data)
+        self.assertEqual(
+            [recipe['id'] for recipe in data['results']], self.ids[:3]
+        )
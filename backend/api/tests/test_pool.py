@@ -0,0 +1,87 @@
+import psycopg2
+from django.db import connection
+from django.test import SimpleTestCase
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from core.postgresql_pool.pool import ConnectionPool
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Выдача и возврат соединений пула."""
+
+    def setUp(self):
+        self.params = connection.get_connection_params()
+        self.pools = []
+
+    def tearDown(self):
+        for pool in self.pools:
+            pool.close()
+
+    def make_pool(self, size=2, timeout=0.05, check_idle=60):
+        pool = ConnectionPool(size, timeout, check_idle)
+        self.pools.append(pool)
+        return pool
+
+    def connect(self):
+        return psycopg2.connect(**self.params)
+
+    def test_connection_is_reused(self):
+        pool = self.make_pool()
+        first = pool.get(self.connect)
+        pool.put(first)
+        self.assertIs(pool.get(self.connect), first)
+        self.assertEqual(pool.created, 1)
+
+    def test_size_and_timeout(self):
+        pool = self.make_pool(size=1)
+        first = pool.get(self.connect)
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.get(self.connect)
+        pool.put(first)
+        self.assertIs(pool.get(self.connect), first)
+
+    def test_failed_connect_releases_slot(self):
+        pool = self.make_pool(size=1)
+
+        def connect():
+            raise psycopg2.OperationalError('connection refused')
+
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.get(connect)
+        pool.put(pool.get(self.connect))
+
+    def test_put_rolls_back_transaction(self):
+        pool = self.make_pool()
+        first = pool.get(self.connect)
+        with first.cursor() as cursor:
+            cursor.execute('CREATE TEMPORARY TABLE pool_test (id int)')
+        pool.put(first)
+        self.assertEqual(first.get_transaction_status(),
+                         TRANSACTION_STATUS_IDLE)
+        with pool.get(self.connect).cursor() as cursor:
+            cursor.execute(
+                "SELECT to_regclass('pg_temp.pool_test') IS NULL"
+            )
+            self.assertTrue(cursor.fetchone()[0])
+
+    def test_closed_connection_is_not_reused(self):
+        pool = self.make_pool(size=1)
+        first = pool.get(self.connect)
+        first.close()
+        pool.put(first)
+        second = pool.get(self.connect)
+        self.assertIsNot(second, first)
+        self.assertEqual(pool.created, 2)
+
+    def test_idle_connection_is_checked(self):
+        pool = self.make_pool(check_idle=0)
+        first = pool.get(self.connect)
+        pid = first.get_backend_pid()
+        pool.put(first)
+        with self.connect() as other, other.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', (pid,))
+        other.close()
+        second = pool.get(self.connect)
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.created, 2)
@@ -0,0 +1,202 @@
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from core.testing import assert_query_budget, emulate_replica
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            RecipeSimilarity, Tag)
+from users.models import Subscription, User
+
+
+def create_data():
+    """
+    Автор с несколькими рецептами и читатель, который на него подписан
+    и добавил рецепты в избранное и в корзину. Рецептов больше одного,
+    чтобы запросы на каждый рецепт вышли за бюджет.
+    """
+    author, reader = (
+        User.objects.create_user(
+            email=f'{name}@example.com',
+            username=name,
+            first_name=name,
+            last_name=name,
+            password='password',
+        )
+        for name in ('author', 'reader')
+    )
+    tags = [
+        Tag.objects.create(name=f'Тег {number}', color=f'#00000{number}',
+                           slug=f'tag{number}')
+        for number in range(2)
+    ]
+    ingredients = [
+        Ingredient.objects.create(name=f'Ингредиент {number}',
+                                  measurement_unit='г')
+        for number in range(3)
+    ]
+    recipes = []
+    for number in range(6):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=f'Рецепт {number}',
+            image='recipes/images/test.jpg',
+            image_variants={'source': 'recipes/images/test.jpg'},
+            text='Описание',
+            cooking_time=10 + number,
+        )
+        recipe.tags.set(tags)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                             amount=number + 1)
+            for ingredient in ingredients
+        )
+        recipes.append(recipe)
+    Subscription.objects.create(user=reader, author=author)
+    reader.favorite_recipes.add(*recipes[:3])
+    reader.shopping_cart_recipes.add(*recipes)
+    token = Token.objects.create(user=reader)
+    return recipes, Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+
+class QueryBudgetTests(TestCase):
+    """Основные эндпоинты укладываются в бюджеты QUERY_BUDGETS."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipes, cls.reader = create_data()
+        cls.token = Token.objects.get(user__username='reader')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_recipe_list(self):
+        for client in (self.client, self.reader):
+            response = client.get('/api/recipes/')
+            self.assertEqual(response.status_code, 200)
+            assert_query_budget(response)
+
+    def test_recipe_detail(self):
+        for client in (self.client, self.reader):
+            response = client.get(f'/api/recipes/{self.recipes[0].pk}/')
+            self.assertEqual(response.status_code, 200)
+            assert_query_budget(response)
+
+    def test_feed(self):
+        response = self.reader.get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 6)
+        assert_query_budget(response)
+
+    def test_subscriptions(self):
+        response = self.reader.get('/api/users/subscriptions/')
+        self.assertEqual(response.status_code, 200)
+        assert_query_budget(response)
+
+    def test_similar(self):
+        recipe, other = self.recipes[:2]
+        RecipeSimilarity.objects.create(
+            recipe=recipe, similar=other, score=0.5
+        )
+        for pk, results in ((recipe.pk, [other.pk]), (other.pk, [])):
+            response = self.reader.get(f'/api/recipes/{pk}/similar/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                [result['id'] for result in response.json()], results
+            )
+            assert_query_budget(response)
+        response = self.reader.get(f'/api/recipes/{other.pk + 100}/similar/')
+        self.assertEqual(response.status_code, 404)
+        assert_query_budget(response)
+
+    def test_subscriptions_without_authors(self):
+        author = self.recipes[0].author
+        token = Token.objects.create(user=author)
+        response = Client(HTTP_AUTHORIZATION=f'Token {token.key}').get(
+            '/api/users/subscriptions/', {'recipes_limit': 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+        assert_query_budget(response)
+
+    def test_download_shopping_cart(self):
+        for format in ('txt', 'csv', 'json', 'pdf'):
+            response = self.reader.get(
+                '/api/recipes/download_shopping_cart/', {'format': format}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(b''.join(response.streaming_content))
+            self.assertGreater(response.metrics.queries, 0)
+            assert_query_budget(response)
+
+    async def test_sync_views_under_asgi(self):
+        for path in ('/api/tags/', '/api/users/',
+                     f'/api/recipes/{self.recipes[0].pk}/'):
+            response = await self.async_client.get(path)
+            self.assertEqual(response.status_code, 200)
+            self.assertGreater(response.metrics.queries, 0)
+
+    async def test_download_shopping_cart_under_asgi(self):
+        response = await self.async_client.get(
+            '/api/recipes/download_shopping_cart/',
+            {'format': 'txt'},
+            authorization=f'Token {self.token.key}',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            b''.join(response.streaming_content).decode().count('\n'), 3
+        )
+        self.assertGreater(response.metrics.queries, 0)
+        assert_query_budget(response)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Чтение уходит на реплику, запись и чтение сразу после записи —
+    в основную базу. Реплика — второе соединение с той же базой,
+    поэтому тест не может идти внутри транзакции TestCase.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.recipes, self.reader = create_data()
+
+    def test_reads_go_to_replica(self):
+        with emulate_replica() as replica:
+            with CaptureQueriesContext(replica) as queries:
+                response = self.reader.get('/api/recipes/')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(queries)
+            assert_query_budget(response)
+
+    def test_reads_after_write_stick_to_primary(self):
+        recipe = self.recipes[-1]
+        primary = connections[DEFAULT_DB_ALIAS]
+        with emulate_replica() as replica, \
+                CaptureQueriesContext(primary) as primary_queries:
+            with CaptureQueriesContext(replica) as queries:
+                response = self.reader.delete(
+                    f'/api/recipes/{recipe.pk}/favorite/'
+                )
+                self.assertEqual(response.status_code, 400)
+                response = self.reader.post(
+                    f'/api/recipes/{recipe.pk}/favorite/'
+                )
+                self.assertEqual(response.status_code, 201)
+                response = self.reader.get(f'/api/recipes/{recipe.pk}/')
+            self.assertFalse(queries)
+            self.assertTrue(response.json()['is_favorited'])
+            self.assertTrue(primary_queries)
+
+    def test_cached_responses_are_built_from_primary(self):
+        primary = connections[DEFAULT_DB_ALIAS]
+        with emulate_replica() as replica, \
+                CaptureQueriesContext(primary) as primary_queries:
+            with CaptureQueriesContext(replica) as queries:
+                for path in (f'/api/recipes/{self.recipes[0].pk}/',
+                             '/api/tags/', '/api/ingredients/'):
+                    response = Client().get(path)
+                    self.assertEqual(response.status_code, 200)
+            self.assertFalse(queries)
+            self.assertTrue(primary_queries)
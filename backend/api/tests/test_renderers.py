@@ -0,0 +1,111 @@
+import re
+import zlib
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from api.renderers import (ShoppingListCSVRenderer, ShoppingListJSONRenderer,
+                           ShoppingListPDFRenderer, ShoppingListTextRenderer,
+                           load_pdf_font)
+
+INGREDIENTS = [
+    {'name': f'Ингредиент {number}', 'measurement_unit': 'г',
+     'amount': number}
+    for number in range(120)
+]
+
+
+class PDFDocument:
+    """Разбор PDF списка покупок по таблице ссылок xref."""
+
+    def __init__(self, data):
+        self.data = data
+        assert data.startswith(b'%PDF-1.4\n') and data.endswith(b'%%EOF\n')
+        xref = int(re.search(rb'startxref\n(\d+)\n%%EOF\n$', data)[1])
+        assert data[xref:].startswith(b'xref\n')
+        size = int(re.match(rb'xref\n0 (\d+)\n', data[xref:])[1])
+        entries = re.findall(
+            rb'(\d{10}) (\d{5}) ([nf]) \n', data[xref:]
+        )[:size]
+        self.objects = {}
+        for number, (offset, _, kind) in enumerate(entries):
+            if kind == b'f':
+                continue
+            start = int(offset)
+            header = b'%d 0 obj\n' % number
+            assert data[start:].startswith(header), number
+            end = data.index(b'\nendobj\n', start)
+            self.objects[number] = data[start + len(header):end]
+        trailer = re.search(rb'trailer\n<< /Size (\d+) /Root (\d+) 0 R', data)
+        assert int(trailer[1]) == size
+        self.root = int(trailer[2])
+
+    def stream(self, number):
+        body = self.objects[number]
+        length = int(re.search(rb'/Length (\d+)', body)[1])
+        start = body.index(b'stream\n') + len(b'stream\n')
+        assert body[start + length:] == b'\nendstream'
+        return zlib.decompress(body[start:start + length])
+
+    def pages(self):
+        catalog = self.objects[self.root]
+        pages = self.objects[int(re.search(rb'/Pages (\d+) 0 R', catalog)[1])]
+        kids = [int(kid) for kid in re.findall(rb'(\d+) 0 R', pages)]
+        assert int(re.search(rb'/Count (\d+)', pages)[1]) == len(kids)
+        return kids
+
+    def text(self, page):
+        contents = int(
+            re.search(rb'/Contents (\d+) 0 R', self.objects[page])[1]
+        )
+        return [
+            bytes.fromhex(line.decode()).decode('cp1251')
+            for line in re.findall(rb'<([0-9a-f]*)> Tj', self.stream(contents))
+        ]
+
+
+class ShoppingListRendererTests(SimpleTestCase):
+    """Потоковые рендереры списка покупок."""
+
+    def render(self, renderer, ingredients=INGREDIENTS):
+        return b''.join(
+            part if isinstance(part, bytes) else part.encode()
+            for part in renderer.stream(iter(ingredients))
+        )
+
+    def test_text_formats(self):
+        self.assertEqual(
+            self.render(ShoppingListTextRenderer(), INGREDIENTS[:2]).decode(),
+            '• Ингредиент 0 (г) - 0\n• Ингредиент 1 (г) - 1\n',
+        )
+        self.assertEqual(
+            self.render(ShoppingListCSVRenderer(), INGREDIENTS[:1]).decode(),
+            'Ингредиент,Единица измерения,Количество\r\n'
+            'Ингредиент 0,г,0\r\n',
+        )
+        self.assertEqual(
+            self.render(ShoppingListJSONRenderer(), []).decode(), '[]'
+        )
+
+    def assert_valid_pdf(self, ingredients):
+        document = PDFDocument(
+            self.render(ShoppingListPDFRenderer(), ingredients)
+        )
+        pages = document.pages()
+        lines = [line for page in pages for line in document.text(page)]
+        self.assertEqual(lines[0], 'Список покупок')
+        self.assertEqual(lines[1:], [
+            ShoppingListPDFRenderer().format_line(ingredient)
+            for ingredient in ingredients
+        ])
+        return pages
+
+    def test_pdf_with_builtin_font(self):
+        with override_settings(SHOPPING_LIST_FONT=''):
+            self.assertEqual(len(self.assert_valid_pdf(INGREDIENTS)), 3)
+            self.assertEqual(len(self.assert_valid_pdf([])), 1)
+
+    def test_pdf_with_embedded_font(self):
+        if load_pdf_font(settings.SHOPPING_LIST_FONT) is None:
+            self.skipTest('Нет файла шрифта SHOPPING_LIST_FONT.')
+        self.assertEqual(len(self.assert_valid_pdf(INGREDIENTS)), 3)
@@ -0,0 +1,72 @@
+from unittest import SkipTest
+
+from django.db import connection
+from django.test import Client, TestCase
+from rest_framework.authtoken.models import Token
+
+from core.testing import assert_query_budget
+from recipes.models import Recipe
+from users.models import User
+
+
+class RecipeSearchTests(TestCase):
+    """Полнотекстовый поиск рецептов и поиск по похожему слову."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            if cursor.fetchone() is None:
+                cls.tearDownClass()
+                raise SkipTest('Нет расширения pg_trgm.')
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Автор',
+            last_name='Рецептов',
+            password='password',
+        )
+        for name, text in (
+            ('Салат с огурцами', 'Подавать вместо борща.'),
+            ('Борщ украинский', 'Сварить бульон.'),
+            ('Котлеты', 'Обжарить.'),
+        ):
+            Recipe.objects.create(
+                author=author,
+                name=name,
+                image='recipes/images/test.jpg',
+                text=text,
+                cooking_time=10,
+            )
+        Recipe.objects.update_search_vector()
+        cls.token = Token.objects.create(user=author)
+
+    def search(self, value):
+        reader = Client(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        names = []
+        for client in (self.client, reader):
+            response = client.get('/api/recipes/', {'search': value})
+            self.assertEqual(response.status_code, 200)
+            assert_query_budget(response)
+            names.append([
+                recipe['name'] for recipe in response.json()['results']
+            ])
+        self.assertEqual(names[0], names[1])
+        return names[0]
+
+    def test_name_ranks_above_text(self):
+        self.assertEqual(
+            self.search('борщ'), ['Борщ украинский', 'Салат с огурцами']
+        )
+
+    def test_typo_falls_back_to_similar_names(self):
+        self.assertEqual(self.search('катлеты'), ['Котлеты'])
+
+    def test_nothing_found(self):
+        self.assertEqual(self.search('пицца'), [])
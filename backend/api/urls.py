@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from .async_views import async_patterns
+from .views import (IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet,
+                    metrics)
 
 app_name = 'api'
 
@@ -10,8 +13,12 @@ router.register('ingredients', IngredientViewSet, basename='ingredient')
 router.register('recipes', RecipeViewSet, basename='recipe')
 router.register('tags', TagViewSet, basename='tag')
 router.register('users', UserViewSet, basename='user')
+router_urls = router.urls
+if settings.ASYNC_VIEWS:
+    router_urls = async_patterns(router_urls)
 urlpatterns = [
-    path('', include(router.urls)),
+    path('_metrics/', metrics, name='metrics'),
+    path('', include(router_urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
@@ -21,6 +21,11 @@ def validate_subscription(self, data):
 
 
 def validate_tags_ingredients(self, data):
+    """
+    Проверяет теги и ингредиенты рецепта. Ингредиенты выбираются одним
+    запросом, и для сохранения рецепта в data вместо их id
+    подставляются объекты Ingredient.
+    """
     tags = data.get('tags')
     if not tags:
         raise ValidationError({'tags': 'Нужно выбрать хотя бы один тег!'})
@@ -43,16 +48,56 @@ def validate_tags_ingredients(self, data):
                 {'ingredient_id': f'Ингредиент с id {ingredient_id} '
                                   'уже добавлен!'}
             )
-        try:
-            Ingredient.objects.get(id=ingredient_id)
-        except Ingredient.DoesNotExist:
+        unique_ingredients.add(ingredient_id)
+    found = Ingredient.objects.in_bulk(unique_ingredients)
+    for ingredient in ingredients:
+        ingredient_id = ingredient['ingredient']['id']
+        if ingredient_id not in found:
             raise ValidationError(
                 {'ingredient_id': f'Ингредиента с id {ingredient_id} нет!'}
             )
-        unique_ingredients.add(ingredient_id)
+        ingredient['ingredient'] = found[ingredient_id]
     return data
 
 
+def validate_recipes_limit(value):
+    if not value:
+        return None
+    try:
+        recipes_limit = int(value)
+    except ValueError:
+        recipes_limit = -1
+    if recipes_limit < 0:
+        raise ValidationError(
+            {'recipes_limit': 'Значение recipes_limit должно быть '
+                              'целым неотрицательным числом.'}
+        )
+    return recipes_limit
+
+
+def validate_have(value):
+    try:
+        have = [int(ingredient_id) for ingredient_id in value.split(',')]
+    except ValueError:
+        have = None
+    if not have or min(have) < 1:
+        raise ValidationError(
+            {'have': 'Укажите id ингредиентов через запятую.'}
+        )
+    return have
+
+
+def validate_max_missing(value):
+    if not value:
+        return None
+    if not value.isdigit():
+        raise ValidationError(
+            {'max_missing': 'Значение max_missing должно быть '
+                            'целым неотрицательным числом.'}
+        )
+    return int(value)
+
+
 def validate_image(value):
     if not value:
         raise ValidationError('Нужно прикрепить картинку!')
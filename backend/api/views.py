@@ -1,24 +1,81 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import (BooleanField, F, OuterRef, Subquery, Sum,
+                              Value)
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
-from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
-from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from core.cache import (INGREDIENTS_NAMESPACE, RECIPES_NAMESPACE,
+                        TAGS_NAMESPACE)
+from core.metrics import registry
+from recipes.counters import change_counter
+from recipes.feed import subscriptions_changed
+from recipes.matching import recipe_matcher
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            RecipeSimilarity, Tag)
+from recipes.relations import UserRelations
 from users.models import Subscription, User
 from .filters import IngredientSearchFilter, RecipeFilter
-from .pagination import Pagination
+from .mixins import CachedResponseMixin, MetricsMixin, RecipeSnapshotMixin
+from .pagination import FeedPagination, Pagination
+from .parsers import MultiPartJSONParser
 from .permissions import ActionPermissions, IsAuthorOrReadOnly
-from .serializers import (IngredientSerializer, RecipeCreateSerializer,
-                          RecipeSerializer, SmallRecipeSerializer,
-                          SubscriptionSerializer, TagSerializer,
-                          UserSerializer)
+from .renderers import (ShoppingListCSVRenderer, ShoppingListJSONRenderer,
+                        ShoppingListPDFRenderer, ShoppingListTextRenderer)
+from .serializers import (BulkChangeSerializer, IngredientSerializer,
+                          RecipeCreateSerializer, RecipeMatchSerializer,
+                          RecipeSerializer, SimilarRecipeSerializer,
+                          SmallRecipeSerializer, SubscriptionSerializer,
+                          TagSerializer, UserSerializer)
+from .validators import (validate_have, validate_max_missing,
+                         validate_recipes_limit)
+
+
+BULK_STATUSES = {
+    'add': ('added', 'already_added'),
+    'remove': ('removed', 'not_added'),
+}
 
 
-class UserViewSet(viewsets.GenericViewSet):
+def bulk_results(ids, found, changed, op, skipped=None):
+    """
+    Результат пакетного изменения для каждого id: not_found, если
+    объекта нет, иначе added/already_added или removed/not_added.
+    Статусы из skipped заменяют статус «не изменён» для своих id.
+    """
+    done, unchanged = BULK_STATUSES[op]
+    skipped = skipped or {}
+    results = []
+    for pk in ids:
+        if pk not in found:
+            status_name = 'not_found'
+        elif pk in changed:
+            status_name = done
+        else:
+            status_name = skipped.get(pk, unchanged)
+        results.append({'id': pk, 'status': status_name})
+    return {'results': results}
+
+
+def lock_user(user):
+    """
+    Блокирует строку пользователя до конца транзакции: подписки,
+    избранное и корзина одного пользователя читаются и меняются
+    по очереди.
+    """
+    User.objects.select_for_update().filter(pk=user.pk).exists()
+
+
+class UserViewSet(MetricsMixin, viewsets.GenericViewSet):
     """Представление пользователей."""
 
     queryset = User.objects.all()
@@ -39,28 +96,83 @@ class UserViewSet(viewsets.GenericViewSet):
         author = get_object_or_404(User, id=pk)
         user = request.user
         if request.method == 'POST':
-            serializer = SubscriptionSerializer(
-                author,
-                data=request.data,
-                context={'request': request}
-            )
-            serializer.is_valid(raise_exception=True)
-            Subscription.objects.create(user=user, author=author)
+            with transaction.atomic():
+                lock_user(user)
+                serializer = SubscriptionSerializer(
+                    author,
+                    data=request.data,
+                    context={'request': request}
+                )
+                serializer.is_valid(raise_exception=True)
+                Subscription.objects.create(user=user, author=author)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
-            subscription = Subscription.objects.filter(
-                user=user,
-                author=author
-            )
-            if subscription.exists():
-                subscription.delete()
+            with transaction.atomic():
+                lock_user(user)
+                subscription = Subscription.objects.filter(
+                    user=user,
+                    author=author
+                )
+                deleted, _ = subscription.delete()
+            if deleted:
                 return Response(status=status.HTTP_204_NO_CONTENT)
             return Response(
                 {'errors': 'Вы не подписаны на этого пользователя!'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+    @action(
+        methods=('post',),
+        detail=False,
+        url_path='subscribe/bulk',
+        permission_classes=(IsAuthenticated,),
+    )
+    def subscribe_bulk(self, request):
+        """
+        Подписка на авторов из списка ids или отписка от них.
+        Счётчики подписчиков и лента пересчитываются один раз
+        для всего списка. Подписки читаются под блокировкой
+        подписчика, а счётчики растут только у авторов, подписка
+        на которых действительно добавлена.
+        """
+        serializer = BulkChangeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        op = serializer.validated_data['op']
+        ids = serializer.validated_data['ids']
+        user = request.user
+        found = set(User.objects.filter(pk__in=ids).values_list(
+            'pk', flat=True
+        ))
+        with transaction.atomic():
+            lock_user(user)
+            subscriptions = Subscription.objects.filter(
+                user=user, author_id__in=found
+            )
+            linked = set(subscriptions.values_list('author_id', flat=True))
+            if op == 'add':
+                Subscription.objects.bulk_create(
+                    (Subscription(user=user, author_id=author_id)
+                     for author_id in found - linked - {user.pk}),
+                    ignore_conflicts=True,
+                )
+                changed = set(subscriptions.values_list(
+                    'author_id', flat=True
+                )) - linked
+                if changed:
+                    change_counter(
+                        User.objects.filter(pk__in=changed),
+                        'followers_count',
+                        1,
+                    )
+                    subscriptions_changed(user.pk)
+            else:
+                changed = linked
+                subscriptions.delete()
+        return Response(bulk_results(ids, found, changed, op, {
+            user.pk: 'self',
+        }))
+
     @action(
         methods=('get',),
         detail=False,
@@ -69,18 +181,36 @@ class UserViewSet(viewsets.GenericViewSet):
         pagination_class=Pagination
     )
     def subscriptions(self, request):
+        authors = self.paginate_queryset(
+            User.objects.filter(subscribing__user=request.user).annotate(
+                is_subscribed=Value(True, output_field=BooleanField()),
+            )
+        )
+        self.add_feed_recipes(
+            authors,
+            validate_recipes_limit(request.GET.get('recipes_limit'))
+        )
         return self.get_paginated_response(
             SubscriptionSerializer(
-                self.paginate_queryset(
-                    User.objects.filter(subscribing__user=request.user)
-                ),
+                authors,
                 many=True,
                 context={'request': request}
             ).data
         )
 
+    def add_feed_recipes(self, authors, recipes_limit):
+        recipes = Recipe.objects.filter(author__in=authors)
+        if recipes_limit is not None:
+            recipes = recipes.first_per_author(recipes_limit)
+        authors_recipes = defaultdict(list)
+        for recipe in recipes:
+            authors_recipes[recipe.author_id].append(recipe)
+        for author in authors:
+            author.feed_recipes = authors_recipes[author.id]
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(MetricsMixin, CachedResponseMixin, RecipeSnapshotMixin,
+                    viewsets.ModelViewSet):
     """Представление рецептов."""
 
     queryset = Recipe.objects.all()
@@ -89,10 +219,42 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filterset_class = RecipeFilter
     pagination_class = Pagination
     permission_classes = (ActionPermissions,)
+    parser_classes = (JSONParser, MultiPartJSONParser)
+    lookup_value_regex = r'\d+'
+    cache_namespace = RECIPES_NAMESPACE
+    cache_timeout = settings.RECIPE_RESPONSE_CACHE_TIMEOUT
+    cache_anonymous_only = True
+
+    @property
+    def cursor_ordering(self):
+        """
+        Курсор строится только по неизменяемым pub_date и id: при
+        сортировке по популярности, времени приготовления или
+        релевантности поиска записи меняют позицию между запросами.
+        """
+        params = self.request.query_params
+        if params.get('search') or params.get('ordering', 'newest') not in (
+                '', 'newest'):
+            return None
+        return ('-pub_date', '-id')
+
+    def get_queryset(self):
+        return super().get_queryset().with_user_annotations(
+            self.request.user
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['relations'] = UserRelations(self.request.user)
+        return context
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'feed'):
             return RecipeSerializer
+        if self.action == 'match':
+            return RecipeMatchSerializer
+        if self.action == 'similar':
+            return SimilarRecipeSerializer
         return RecipeCreateSerializer
 
     def add_recipe(self, relation, user, pk):
@@ -119,10 +281,34 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     def handle_recipe(self, request, pk=None, relation=None):
-        if request.method == 'POST':
-            return self.add_recipe(relation, request.user, pk)
-        else:
-            return self.delete_recipe(relation, request.user, pk)
+        with transaction.atomic():
+            lock_user(request.user)
+            if request.method == 'POST':
+                return self.add_recipe(relation, request.user, pk)
+            else:
+                return self.delete_recipe(relation, request.user, pk)
+
+    def bulk_change(self, request, relation):
+        serializer = BulkChangeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        op = serializer.validated_data['op']
+        ids = serializer.validated_data['ids']
+        manager = getattr(request.user, relation)
+        found = set(Recipe.objects.filter(pk__in=ids).values_list(
+            'pk', flat=True
+        ))
+        with transaction.atomic():
+            lock_user(request.user)
+            linked = set(manager.filter(pk__in=found).values_list(
+                'pk', flat=True
+            ))
+            if op == 'add':
+                changed = found - linked
+                manager.add(*changed)
+            else:
+                changed = linked
+                manager.remove(*changed)
+        return Response(bulk_results(ids, found, changed, op))
 
     @action(
         methods=('post', 'delete'),
@@ -140,38 +326,147 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def shopping_cart(self, request, pk):
         return self.handle_recipe(request, pk, 'shopping_cart_recipes')
 
+    @action(
+        methods=('post',),
+        detail=False,
+        url_path='favorite/bulk',
+        permission_classes=(IsAuthenticated,),
+    )
+    def favorite_bulk(self, request):
+        """Добавление рецептов из списка ids в избранное или удаление."""
+        return self.bulk_change(request, 'favorite_recipes')
+
+    @action(
+        methods=('post',),
+        detail=False,
+        url_path='shopping_cart/bulk',
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_cart_bulk(self, request):
+        """Добавление рецептов из списка ids в корзину или удаление."""
+        return self.bulk_change(request, 'shopping_cart_recipes')
+
+    @action(
+        methods=('get',),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+    )
+    def feed(self, request):
+        """
+        Лента: рецепты авторов, на которых подписан пользователь,
+        от новых к старым, с постраничным выводом по курсору.
+        """
+        paginator = FeedPagination()
+        recipe_ids = paginator.paginate_feed(request, request.user.pk)
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        page = [
+            recipes[recipe_id] for recipe_id in recipe_ids
+            if recipe_id in recipes
+        ]
+        return paginator.get_paginated_response(
+            self.get_serializer(page, many=True).data
+        )
+
+    @action(
+        methods=('get',),
+        detail=False,
+    )
+    def match(self, request):
+        """
+        Рецепты, которые можно приготовить из ингредиентов have:
+        по числу недостающих ингредиентов, затем по сходству наборов.
+        """
+        matches = self.paginate_queryset(recipe_matcher.match(
+            validate_have(request.query_params.get('have', '')),
+            validate_max_missing(request.query_params.get('max_missing')),
+        ))
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in matches]
+        )
+        page = []
+        for recipe_id, missing, score in matches:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                recipe.missing_count = missing
+                recipe.match_score = round(score, 4)
+                page.append(recipe)
+        return self.get_paginated_response(
+            self.get_serializer(page, many=True).data
+        )
+
+    @action(
+        methods=('get',),
+        detail=True,
+    )
+    def similar(self, request, pk):
+        """
+        Похожие рецепты, заранее рассчитанные командой
+        build_recommendations, по убыванию сходства.
+
+        Сам рецепт выбирается тем же запросом и идёт последним, так как
+        у него нет сходства: по нему видно, что рецепт существует.
+        """
+        similar = RecipeSimilarity.objects.filter(recipe_id=pk).order_by()
+        recipe_ids = similar.values('similar_id').union(
+            Recipe.objects.filter(pk=pk).order_by().values('pk'), all=True
+        )
+        recipes = list(Recipe.objects.filter(pk__in=recipe_ids).annotate(
+            score=Subquery(
+                similar.filter(similar=OuterRef('pk')).values('score')
+            )
+        ).order_by(F('score').desc(nulls_last=True)))
+        if not recipes or recipes[-1].score is not None:
+            raise Http404
+        recipes = recipes[:-1]
+        for recipe in recipes:
+            recipe.score = round(recipe.score, 4)
+        return Response(self.get_serializer(recipes, many=True).data)
+
     @action(
         methods=('get',),
         detail=False,
         permission_classes=(IsAuthenticated,),
+        renderer_classes=(
+            ShoppingListTextRenderer,
+            ShoppingListCSVRenderer,
+            ShoppingListJSONRenderer,
+            ShoppingListPDFRenderer,
+        ),
     )
     def download_shopping_cart(self, request):
+        """
+        Список покупок отдаётся потоком: строки читаются из базы
+        порциями по SHOPPING_LIST_CHUNK_SIZE и сразу рендерятся.
+        Под ASGI Django 3.2 читает тело ответа в цикле событий, где
+        запросы к базе запрещены, поэтому строки выбираются заранее:
+        их не больше, чем ингредиентов в справочнике, а само тело
+        по-прежнему формируется по частям.
+        """
         ingredients = RecipeIngredient.objects.filter(
             recipe__users_shopping_cart_recipes=request.user
         ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount'))
-        shopping_cart = {}
-        for ingredient in ingredients:
-            name = ingredient['ingredient__name']
-            measurement_unit = ingredient['ingredient__measurement_unit']
-            amount = ingredient['amount']
-            key = f'{name} ({measurement_unit})'
-            if key in shopping_cart:
-                shopping_cart[key] += amount
-            else:
-                shopping_cart[key] = amount
-        final_shopping_cart = [f'• {key} - {value}'
-                               for key, value in shopping_cart.items()]
-        response = HttpResponse('\n'.join(final_shopping_cart),
-                                content_type='text/plain')
-        response['Content-Disposition'] = ('attachment; '
-                                           'filename=shopping-list.txt')
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit'),
+        ).annotate(
+            amount=Sum('amount')
+        ).order_by('name', 'measurement_unit')
+        if isinstance(request._request, ASGIRequest):
+            rows = list(ingredients)
+        else:
+            rows = ingredients.iterator(
+                chunk_size=settings.SHOPPING_LIST_CHUNK_SIZE
+            )
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(rows),
+            content_type=renderer.content_type,
+        )
+        response['Content-Disposition'] = renderer.content_disposition
         return response
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(MetricsMixin, CachedResponseMixin,
+                        viewsets.ReadOnlyModelViewSet):
     """Представление ингредиентов."""
 
     queryset = Ingredient.objects.all()
@@ -180,12 +475,24 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ('name',)
     permission_classes = (AllowAny,)
     pagination_class = None
+    cache_namespace = INGREDIENTS_NAMESPACE
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(MetricsMixin, CachedResponseMixin,
+                 viewsets.ReadOnlyModelViewSet):
     """Представление тегов."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
+    cache_namespace = TAGS_NAMESPACE
+
+
+@api_view(('get',))
+@permission_classes((IsAdminUser,))
+def metrics(request):
+    """Накопленные метрики запросов в текстовом формате."""
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
@@ -22,6 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'django_filters',
     'rest_framework.authtoken',
@@ -33,6 +34,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryMetricsMiddleware',
+    'core.middleware.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,14 +67,62 @@ TEMPLATES = [
 WSGI_APPLICATION = 'backend.wsgi.application'
 
 
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 0))
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'core.postgresql_pool' if DB_POOL_SIZE
+            else 'django.db.backends.postgresql'
+        ),
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', 'db'),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': (
+            0 if DB_POOL_SIZE else int(os.getenv('DB_CONN_MAX_AGE', 60))
+        ),
+        'POOL_SIZE': DB_POOL_SIZE,
+        'POOL_TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+    }
+}
+CONN_HEALTH_CHECK_IDLE = int(os.getenv('DB_HEALTH_CHECK_IDLE', 30))
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', False) == 'True'
+ASYNC_DB_THREADS = int(os.getenv('ASYNC_DB_THREADS', 8))
+
+DATABASE_REPLICAS = {
+    f'replica_{number}': {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+    for number, host in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1
+    )
+}
+DATABASES.update(DATABASE_REPLICAS)
+DATABASE_ROUTERS = ('core.routers.ReplicaRouter',)
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+
+CACHE_BACKENDS = {
+    'redis': 'django_redis.cache.RedisCache',
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+CACHE_LOCATIONS = {
+    'redis': 'redis://redis:6379/1',
+    'locmem': 'foodgram',
+    'file': str(BASE_DIR / 'cache'),
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'redis')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', CACHE_LOCATIONS[CACHE_BACKEND]
+        ),
+        'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'foodgram'),
     }
 }
 
@@ -99,8 +150,7 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
-    'DEFAULT_PAGINATION_CLASS':
-        'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.Pagination',
     'PAGE_SIZE': 6,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
@@ -139,3 +189,51 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+QUERY_BUDGETS = {
+    'RecipeViewSet.list': 8,
+    'RecipeViewSet.retrieve': 7,
+    'RecipeViewSet.match': 7,
+    'RecipeViewSet.feed': 8,
+    'RecipeViewSet.similar': 2,
+    'RecipeViewSet.download_shopping_cart': 3,
+    'UserViewSet.subscriptions': 5,
+    'IngredientViewSet.list': 1,
+    'IngredientViewSet.retrieve': 1,
+    'TagViewSet.list': 1,
+    'TagViewSet.retrieve': 1,
+}
+
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+RECIPE_RESPONSE_CACHE_TIMEOUT = 60 * 5
+RECIPE_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+USER_RELATIONS_CACHE_TIMEOUT = 60 * 60
+
+FEED_HEAD_SIZE = 100
+FEED_CACHE_TIMEOUT = 60 * 60
+
+SHOPPING_LIST_CHUNK_SIZE = 500
+
+BULK_MAX_IDS = 100
+SHOPPING_LIST_FONT = os.getenv(
+    'SHOPPING_LIST_FONT', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+RECIPE_IMAGE_VARIANTS = {
+    'card': 480,
+    'detail': 960,
+    'retina': 1920,
+}
+RECIPE_IMAGE_FORMATS = ('webp', 'avif', 'jpeg')
+RECIPE_IMAGE_QUALITY = 80
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
+RECIPE_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+RECIPE_IMAGE_MAX_PIXELS = 40_000_000
+
+RECOMMENDATION_WEIGHTS = {
+    'favorites': 0.6,
+    'ingredients': 0.3,
+    'tags': 0.1,
+}
+RECOMMENDATIONS_TOP_K = 10
+RECOMMENDATIONS_MAX_DF = 0.1
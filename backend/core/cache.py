@@ -0,0 +1,101 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+INGREDIENTS_NAMESPACE = 'ingredients'
+TAGS_NAMESPACE = 'tags'
+RECIPES_NAMESPACE = 'recipes'
+RECIPE_SNAPSHOTS_NAMESPACE = 'recipe_snapshots'
+RECIPE_INGREDIENTS_NAMESPACE = 'recipe_ingredients'
+
+VERSION_KEY = 'version:{namespace}'
+NAMESPACED_KEY = '{namespace}:{version}:{name}:{digest}'
+CHANGE_KEY = 'change:{namespace}:{version}'
+CHANGES_TIMEOUT = 60 * 60
+
+
+def get_version(namespace):
+    """Текущая версия данных пространства имён."""
+    return cache.get_or_set(
+        VERSION_KEY.format(namespace=namespace), time.time_ns(), timeout=None
+    )
+
+
+def get_versions(namespaces):
+    """
+    Текущие версии нескольких пространств имён за одно обращение
+    к кэшу: {пространство имён: версия}.
+    """
+    keys = {
+        VERSION_KEY.format(namespace=namespace): namespace
+        for namespace in namespaces
+    }
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        versions[key] = cache.get_or_set(key, time.time_ns(), timeout=None)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def bump_version(namespace):
+    """
+    Сдвигает версию: всё, что построено на данных пространства имён,
+    считается устаревшим.
+    """
+    key = VERSION_KEY.format(namespace=namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def bump_version_on_commit(namespace):
+    """Сдвигает версию после фиксации текущей транзакции."""
+    transaction.on_commit(lambda: bump_version(namespace))
+
+
+def make_key(namespace, name, *parts, version=None):
+    """
+    Ключ кэша в версии version или текущей версии пространства имён.
+    Части ключа сворачиваются в хеш, поэтому длина ключа не зависит
+    от них.
+    """
+    digest = hashlib.sha1('\n'.join(map(str, parts)).encode()).hexdigest()
+    return NAMESPACED_KEY.format(
+        namespace=namespace,
+        version=version or get_version(namespace),
+        name=name,
+        digest=digest,
+    )
+
+
+def record_change(namespace, value):
+    """
+    Сдвигает версию и запоминает, что изменилось в этой версии, чтобы
+    другие процессы могли обновить свои данные, не перестраивая их.
+    """
+    version = bump_version(namespace)
+    cache.set(
+        CHANGE_KEY.format(namespace=namespace, version=version),
+        value,
+        timeout=CHANGES_TIMEOUT,
+    )
+    return version
+
+
+def get_changes(namespace, since, until):
+    """
+    Изменения версий от since (не включая) до until. Возвращает None,
+    если какое-то изменение не записано или уже вытеснено из кэша.
+    """
+    keys = [
+        CHANGE_KEY.format(namespace=namespace, version=version)
+        for version in range(since + 1, until + 1)
+    ]
+    changes = cache.get_many(keys)
+    if len(changes) != len(keys):
+        return None
+    return [changes[key] for key in keys]
@@ -0,0 +1,115 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from .metrics import request_metrics
+
+
+def check_connection(connection):
+    """
+    Закрывает постоянное соединение, если оно простаивало дольше
+    CONN_HEALTH_CHECK_IDLE секунд и не отвечает на SELECT 1.
+    Django 3.2 не проверяет соединение перед повторным
+    использованием, и первый запрос после обрыва падал бы с ошибкой.
+    """
+    if connection.connection is None:
+        return
+    idle = time.monotonic() - getattr(connection, 'last_used', 0)
+    if idle >= settings.CONN_HEALTH_CHECK_IDLE and not connection.is_usable():
+        connection.close()
+
+
+def check_connections():
+    for connection in connections.all():
+        check_connection(connection)
+
+
+def mark_connections_used():
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.last_used = now
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    Обёртка соединений для асинхронного режима: запрос попадает
+    в метрики из контекста request_metrics, если они заданы.
+    """
+    metrics = request_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_metrics():
+    """
+    Подключает count_queries к соединениям текущего потока.
+    Обёртка остаётся на соединениях потока и без метрик в контексте
+    ничего не делает, поэтому подключается один раз.
+    """
+    for connection in connections.all():
+        if count_queries not in connection.execute_wrappers:
+            connection.execute_wrappers.append(count_queries)
+
+
+class DatabaseExecutor:
+    """
+    Ограниченный пул потоков для синхронного кода асинхронных
+    представлений. У каждого потока свои соединения с базой, поэтому
+    их не больше ASYNC_DB_THREADS на процесс.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.executor = None
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=settings.ASYNC_DB_THREADS,
+                    thread_name_prefix='async-db',
+                )
+            return self.executor
+
+    def run(self, func, *args, **kwargs):
+        """
+        Выполняет func так же, как Django выполняет синхронный запрос:
+        с проверкой соединений до и закрытием устаревших после.
+        SQL-запросы попадают в метрики текущего запроса.
+        """
+        close_old_connections()
+        check_connections()
+        install_query_metrics()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+            mark_connections_used()
+
+
+database_executor = DatabaseExecutor()
+
+
+def database_sync_to_async(func):
+    """
+    Асинхронная обёртка для синхронного кода с запросами к базе.
+
+    В Django 3.2 нет асинхронного ORM, поэтому код выполняется
+    в пуле потоков database_executor, а не в общем потоке
+    thread_sensitive: запросы не ждут друг друга, а число соединений
+    ограничено.
+    """
+    @wraps(func)
+    def run(*args, **kwargs):
+        return database_executor.run(func, *args, **kwargs)
+
+    return sync_to_async(
+        run, thread_sensitive=False, executor=database_executor.get_executor()
+    )
@@ -6,6 +6,7 @@ MAX_MEASUREMENT_UNIT_LENGTH = 150
 MAX_RECIPE_NAME_LENGTH = 200
 MIN_VALUE_COOKING_TIME = 1
 MIN_VALUE_INGREDIENT_AMOUNT = 1
+SEARCH_CONFIG = 'russian'
 
 MAX_USERNAME_LENGTH = 150
 MAX_EMAIL_LENGTH = 150
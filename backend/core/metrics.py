@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+class RequestMetrics:
+    """
+    Метрики одного запроса: число SQL-запросов, время в базе данных,
+    время сериализации и общее время.
+
+    Экземпляр подключается к соединениям как execute_wrapper и считает
+    каждый выполненный запрос.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.action = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+        self.total_time = 0.0
+        self.view_started = None
+        self.view_db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def start_view(self):
+        self.view_started = time.perf_counter()
+        self.view_db_time = self.db_time
+
+    def finish_view(self, action):
+        """
+        Время сериализации считается как время работы представления
+        за вычетом времени, проведённого в базе данных.
+        """
+        self.action = action
+        if self.view_started is not None:
+            self.serialization_time = max(
+                time.perf_counter() - self.view_started
+                - (self.db_time - self.view_db_time),
+                0.0,
+            )
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self.started
+
+    @property
+    def budget(self):
+        return settings.QUERY_BUDGETS.get(self.action)
+
+    def server_timing(self):
+        return ', '.join((
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries"',
+            f'serialize;dur={self.serialization_time * 1000:.2f}',
+            f'total;dur={self.total_time * 1000:.2f}',
+        ))
+
+
+class MetricsRegistry:
+    """Накопленные в процессе метрики по действиям представлений."""
+
+    FIELDS = (
+        ('requests_total', 'Число запросов'),
+        ('queries_total', 'Число SQL-запросов'),
+        ('queries_max', 'Максимум SQL-запросов за запрос'),
+        ('db_seconds_total', 'Время в базе данных'),
+        ('serialization_seconds_total', 'Время сериализации'),
+        ('request_seconds_total', 'Общее время'),
+        ('request_seconds_max', 'Максимальное время запроса'),
+        ('over_budget_total', 'Запросы сверх бюджета SQL-запросов'),
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.actions = defaultdict(lambda: defaultdict(float))
+
+    def record(self, metrics):
+        budget = metrics.budget
+        with self.lock:
+            stats = self.actions[metrics.action]
+            stats['requests_total'] += 1
+            stats['queries_total'] += metrics.queries
+            stats['queries_max'] = max(stats['queries_max'], metrics.queries)
+            stats['db_seconds_total'] += metrics.db_time
+            stats['serialization_seconds_total'] += (
+                metrics.serialization_time
+            )
+            stats['request_seconds_total'] += metrics.total_time
+            stats['request_seconds_max'] = max(
+                stats['request_seconds_max'], metrics.total_time
+            )
+            if budget is not None and metrics.queries > budget:
+                stats['over_budget_total'] += 1
+
+    def reset(self):
+        with self.lock:
+            self.actions.clear()
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        with self.lock:
+            actions = {
+                action: dict(stats) for action, stats in self.actions.items()
+            }
+        lines = []
+        for field, description in self.FIELDS:
+            lines += [
+                f'# HELP foodgram_{field} {description}',
+                f'# TYPE foodgram_{field} '
+                f'{"gauge" if field.endswith("_max") else "counter"}',
+            ]
+            lines += [
+                f'foodgram_{field}{{action="{action}"}} '
+                f'{stats.get(field, 0):g}'
+                for action, stats in sorted(actions.items())
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+request_metrics = ContextVar('request_metrics', default=None)
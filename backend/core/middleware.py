@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import logging
+from contextlib import ExitStack
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .connections import install_query_metrics
+from .metrics import RequestMetrics, registry, request_metrics
+from .routers import replica_reads
+
+logger = logging.getLogger(__name__)
+
+
+class QueryMetricsMiddleware:
+    """
+    Считает SQL-запросы и время обработки каждого запроса.
+
+    Результат попадает в заголовок Server-Timing, в общий реестр метрик
+    и в атрибут metrics ответа. Превышение бюджета из QUERY_BUDGETS
+    записывается в лог.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        metrics = self.start(request)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+            response = self.get_response(request)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        """
+        В асинхронном режиме запросы к базе идут из потоков
+        database_sync_to_async и из общего потока, в котором Django
+        выполняет синхронные представления и middleware. Соединения
+        этих потоков берут метрики из контекста.
+
+        Django 3.2 читает тело потокового ответа прямо в цикле событий,
+        где запросы к базе запрещены: потоковое представление должно
+        выбрать данные из базы до возврата ответа.
+        """
+        metrics = self.start(request)
+        token = request_metrics.set(metrics)
+        try:
+            await sync_to_async(
+                install_query_metrics, thread_sensitive=True
+            )()
+            response = await self.get_response(request)
+        finally:
+            request_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def start(self, request):
+        metrics = RequestMetrics()
+        request.metrics = metrics
+        return metrics
+
+    def finish(self, request, response, metrics):
+        if metrics.action is None and request.resolver_match is not None:
+            metrics.action = request.resolver_match.view_name
+        response.metrics = metrics
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, metrics
+            )
+            return response
+        metrics.finish()
+        self.record(metrics)
+        response['Server-Timing'] = metrics.server_timing()
+        return response
+
+    def stream(self, content, metrics):
+        """
+        Тело потокового ответа формируется уже после выхода из
+        middleware, поэтому запросы считаются во время отдачи тела,
+        а метрики записываются, когда оно отдано. Заголовки к этому
+        времени уже отправлены, поэтому Server-Timing у таких ответов
+        нет.
+        """
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                yield from content
+        finally:
+            metrics.finish()
+            self.record(metrics)
+
+    def record(self, metrics):
+        if metrics.action is None:
+            return
+        registry.record(metrics)
+        budget = metrics.budget
+        if budget is not None and metrics.queries > budget:
+            logger.warning(
+                '%s: %d SQL-запросов при бюджете %d',
+                metrics.action, metrics.queries, budget,
+            )
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Разрешает чтение с реплик для запросов GET, HEAD и OPTIONS.
+
+    После успешного запроса на запись чтения этого клиента ещё
+    REPLICA_STICKY_SECONDS идут в основную базу, чтобы он видел свои
+    изменения, пока реплика отстаёт. Клиент с токеном отмечается
+    в кэше по хешу заголовка Authorization, остальные — cookie.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    cookie_name = 'db_sticky'
+    key = 'sticky:{digest}'
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def get_key(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        digest = hashlib.sha1(authorization.encode()).hexdigest()
+        return self.key.format(digest=digest)
+
+    def is_sticky(self, request, key):
+        if self.cookie_name in request.COOKIES:
+            return True
+        return key is not None and cache.get(key) is not None
+
+    def mark_sticky(self, request, response, key):
+        if request.method in self.SAFE_METHODS or response.status_code >= 400:
+            return
+        timeout = settings.REPLICA_STICKY_SECONDS
+        if key is not None:
+            cache.set(key, True, timeout)
+        response.set_cookie(
+            self.cookie_name, '1', max_age=timeout, httponly=True
+        )
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        key = self.get_key(request)
+        safe = request.method in self.SAFE_METHODS
+        token = replica_reads.set(safe and not self.is_sticky(request, key))
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+        self.mark_sticky(request, response, key)
+        return response
+
+    async def __acall__(self, request):
+        key = self.get_key(request)
+        safe = request.method in self.SAFE_METHODS
+        token = replica_reads.set(
+            safe and not await sync_to_async(self.is_sticky)(request, key)
+        )
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+        if not safe:
+            await sync_to_async(self.mark_sticky)(request, response, key)
+        return response
@@ -0,0 +1,61 @@
+import os
+import threading
+
+from django.conf import settings
+from django.db.backends.postgresql import base
+
+from .pool import ConnectionPool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Бэкенд PostgreSQL с пулом соединений внутри процесса.
+
+    Вместо закрытия соединение возвращается в пул своей базы, поэтому
+    при CONN_MAX_AGE = 0 запрос берёт уже открытое соединение, а не
+    устанавливает новое. Пул общий для потоков процесса, что нужно
+    воркерам gthread и gevent. Размер и время ожидания задаются
+    ключами POOL_SIZE и POOL_TIMEOUT настроек базы.
+    """
+
+    pools = {}
+    pools_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        pool = self.pools.get(self.alias)
+        if pool is None or pool.pid != os.getpid():
+            with self.pools_lock:
+                pool = self.pools.get(self.alias)
+                if pool is None or pool.pid != os.getpid():
+                    pool = self.pools[self.alias] = ConnectionPool(
+                        self.settings_dict['POOL_SIZE'],
+                        self.settings_dict['POOL_TIMEOUT'],
+                        settings.CONN_HEALTH_CHECK_IDLE,
+                    )
+        return pool
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.get(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            )
+        )
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.put(self.connection)
+
+
+def close_pools():
+    """Закрывает свободные соединения всех пулов процесса."""
+    with DatabaseWrapper.pools_lock:
+        pools = list(DatabaseWrapper.pools.values())
+        DatabaseWrapper.pools.clear()
+    for pool in pools:
+        pool.close()
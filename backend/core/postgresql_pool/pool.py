@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from collections import deque
+
+from psycopg2 import Error, OperationalError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+
+class ConnectionPool:
+    """
+    Пул соединений psycopg2 внутри процесса.
+
+    Размер ограничивает общее число соединений: и выданных, и
+    свободных. Если свободных нет, а лимит исчерпан, get ждёт
+    возврата соединения не дольше timeout секунд. Свободное
+    соединение, пролежавшее дольше check_idle секунд, перед выдачей
+    проверяется запросом SELECT 1. Пул привязан к процессу:
+    после fork соединения родителя не используются.
+    """
+
+    def __init__(self, size, timeout, check_idle):
+        self.size = size
+        self.timeout = timeout
+        self.check_idle = check_idle
+        self.pid = os.getpid()
+        self.idle = deque()
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.created = 0
+
+    def get(self, connect):
+        """Выдаёт свободное соединение или открывает новое через connect."""
+        if not self.slots.acquire(timeout=self.timeout):
+            raise OperationalError(
+                f'Нет свободных соединений в пуле за {self.timeout} с'
+            )
+        try:
+            while True:
+                with self.lock:
+                    if not self.idle:
+                        break
+                    connection, last_used = self.idle.pop()
+                if self.is_usable(connection, last_used):
+                    return connection
+                self.discard(connection)
+            connection = connect()
+            self.created += 1
+            return connection
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def put(self, connection):
+        """
+        Возвращает соединение в пул. Незавершённая транзакция
+        откатывается; соединение, которое не удалось вернуть в
+        исходное состояние, закрывается.
+        """
+        try:
+            if connection.closed:
+                return
+            if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                try:
+                    connection.rollback()
+                except Error:
+                    self.discard(connection)
+                    return
+            with self.lock:
+                self.idle.append((connection, time.monotonic()))
+        finally:
+            self.slots.release()
+
+    def is_usable(self, connection, last_used):
+        if connection.closed:
+            return False
+        if time.monotonic() - last_used < self.check_idle:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.rollback()
+        except Error:
+            return False
+        return True
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def close(self):
+        """Закрывает свободные соединения пула."""
+        with self.lock:
+            idle, self.idle = self.idle, deque()
+        for connection, _ in idle:
+            self.discard(connection)
@@ -0,0 +1,39 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+class ReplicaRouter:
+    """
+    Маршрутизация запросов между основной базой и репликами.
+
+    Запись всегда идёт в основную базу. Чтение уходит на случайную
+    реплику из DATABASE_REPLICAS, только если это разрешил
+    ReplicaStickinessMiddleware для текущего запроса и нет открытой
+    транзакции. Команды, фоновые потоки и запросы на запись читают
+    из основной базы. Связанные объекты читаются из той же базы,
+    что и объект, от которого к ним перешли.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or not replica_reads.get()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(tuple(replicas))
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
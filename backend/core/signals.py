@@ -0,0 +1,14 @@
+from django.core.signals import request_finished, request_started
+from django.dispatch import receiver
+
+from .connections import check_connections, mark_connections_used
+
+
+@receiver(request_started)
+def request_started_check(**kwargs):
+    check_connections()
+
+
+@receiver(request_finished)
+def request_finished_mark(**kwargs):
+    mark_connections_used()
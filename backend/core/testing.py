@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import override_settings
+
+
+def assert_query_budget(response, budget=None):
+    """
+    Проверяет, что запрос уложился в бюджет SQL-запросов.
+
+    Бюджет берётся из аргумента или из QUERY_BUDGETS по имени действия,
+    например 'RecipeViewSet.list'. Нужен QueryMetricsMiddleware.
+    """
+    metrics = getattr(response, 'metrics', None)
+    if metrics is None:
+        raise AssertionError(
+            'В ответе нет метрик: подключите QueryMetricsMiddleware.'
+        )
+    if budget is None:
+        budget = settings.QUERY_BUDGETS.get(metrics.action)
+    if budget is None:
+        raise AssertionError(f'Для {metrics.action} не задан бюджет.')
+    if metrics.queries > budget:
+        raise AssertionError(
+            f'{metrics.action}: {metrics.queries} SQL-запросов '
+            f'при бюджете {budget}.'
+        )
+
+
+@contextmanager
+def emulate_replica(alias='replica'):
+    """
+    Подключает реплику alias — второе соединение с той же базой,
+    что и default, — и включает её в DATABASE_REPLICAS. Так можно
+    проверить, куда ReplicaRouter отправляет запросы, без настоящей
+    репликации. Запросы к реплике видны в CaptureQueriesContext
+    для connections[alias].
+    """
+    connections.databases[alias] = {
+        **connections.databases[DEFAULT_DB_ALIAS],
+        'TEST': {'MIRROR': DEFAULT_DB_ALIAS},
+    }
+    try:
+        with override_settings(DATABASE_REPLICAS={
+            alias: connections.databases[alias],
+        }):
+            yield connections[alias]
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        del connections.databases[alias]
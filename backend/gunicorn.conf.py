@@ -0,0 +1,57 @@
+"""
+Настройки gunicorn: "gunicorn -c gunicorn.conf.py".
+
+GUNICORN_SERVER=asgi запускает backend.asgi на воркерах uvicorn:
+горячие эндпоинты чтения становятся асинхронными, а запросы к базе
+идут из пула ASYNC_DB_THREADS потоков каждого воркера.
+
+По умолчанию запускается backend.wsgi на воркерах gthread: несколько
+процессов с потоками внутри. С DB_POOL_SIZE не меньше GUNICORN_THREADS
+потоки процесса берут соединения из общего пула, а без пула каждый
+поток держит своё постоянное соединение (DB_CONN_MAX_AGE).
+Для воркеров gevent psycopg2 нужно сделать кооперативным, например
+через psycogreen в post_fork.
+
+Версии кэша должны быть общими для всех процессов, поэтому с
+несколькими воркерами кэш locmem не запускается.
+"""
+import multiprocessing
+import os
+
+asgi = os.getenv('GUNICORN_SERVER', 'wsgi') == 'asgi'
+wsgi_app = 'backend.asgi:application' if asgi else 'backend.wsgi:application'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.getenv(
+    'GUNICORN_WORKER_CLASS',
+    'uvicorn.workers.UvicornWorker' if asgi else 'gthread',
+)
+workers = int(os.getenv(
+    'GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1
+))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+if workers > 1 and os.getenv('CACHE_BACKEND') == 'locmem':
+    raise RuntimeError(
+        'CACHE_BACKEND=locmem нельзя использовать с несколькими '
+        'воркерами: сброс версии кэша не дойдёт до других процессов.'
+    )
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-')
+
+
+def pre_fork(server, worker):
+    """
+    С preload_app приложение загружено в мастере: открытые там
+    соединения не должны достаться воркерам после fork.
+    """
+    from django.db import connections
+
+    from core.postgresql_pool.base import close_pools
+
+    connections.close_all()
+    close_pools()
@@ -1,6 +1,8 @@
 from django.contrib import admin
 
+from .matching import recipe_matcher
 from .models import Ingredient, Recipe, RecipeIngredient, Tag
+from .snapshots import drop_snapshots
 
 
 @admin.register(Ingredient)
@@ -50,8 +52,18 @@ class RecipeAdmin(admin.ModelAdmin):
     filter_horizontal = ('tags',)
     inlines = (RecipeIngredientAdmin,)
 
+    def save_model(self, request, obj, form, change):
+        obj.similar_outdated = True
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        Recipe.objects.filter(pk=form.instance.pk).update_search_vector()
+        recipe_matcher.changed(form.instance.pk)
+        drop_snapshots([form.instance.pk])
+
     def get_favorite_count(self, obj):
-        return obj.users_favorite_recipes.count()
+        return obj.favorites_count
     get_favorite_count.short_description = 'Число добавлений в избранное'
 
     def display_ingredients(self, obj):
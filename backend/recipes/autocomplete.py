@@ -0,0 +1,63 @@
+import threading
+from bisect import bisect_left
+
+from django.db import DEFAULT_DB_ALIAS
+
+from core.cache import INGREDIENTS_NAMESPACE, get_version
+from .models import Ingredient
+
+
+class IngredientIndex:
+    """
+    Индекс названий ингредиентов для автодополнения.
+
+    Хранит отсортированные названия в нижнем регистре в памяти процесса
+    и перестраивается, когда меняется версия пространства имён
+    ингредиентов. Названия и ингредиенты публикуются одним кортежем,
+    чтобы читатель без блокировки не увидел половину нового индекса.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.entries = ([], [])
+
+    def build(self, version):
+        ingredients = sorted(
+            Ingredient.objects.using(DEFAULT_DB_ALIAS),
+            key=lambda ingredient: (ingredient.name.casefold(), ingredient.id)
+        )
+        self.entries = (
+            [ingredient.name.casefold() for ingredient in ingredients],
+            ingredients,
+        )
+        self.version = version
+
+    def refresh(self):
+        version = get_version(INGREDIENTS_NAMESPACE)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.build(version)
+
+    def search(self, query, limit=None):
+        """
+        Возвращает ингредиенты, название которых совпадает с query,
+        начинается с него или содержит его, в таком порядке.
+        """
+        self.refresh()
+        names, ingredients = self.entries
+        query = query.casefold()
+        start = bisect_left(names, query)
+        end = bisect_left(names, query + '\uffff', start)
+        result = ingredients[start:end]
+        if limit is not None and len(result) >= limit:
+            return result[:limit]
+        result.extend(
+            ingredient for name, ingredient in zip(names, ingredients)
+            if query in name and not name.startswith(query)
+        )
+        return result[:limit]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,41 @@
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from users.models import Subscription, User
+from .models import Recipe
+
+
+def count_subquery(queryset, relation):
+    """Число строк queryset, которые ссылаются на OuterRef('pk')."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{relation: OuterRef('pk')}).order_by().values(
+                relation
+            ).annotate(count=Count('pk')).values('count')
+        ),
+        0,
+    )
+
+
+def get_counters():
+    """Счётчики: модель, поле, связанные строки и поле связи."""
+    return (
+        (Recipe, 'favorites_count',
+         User.favorite_recipes.through.objects, 'recipe'),
+        (Recipe, 'in_carts_count',
+         User.shopping_cart_recipes.through.objects, 'recipe'),
+        (User, 'recipes_count', Recipe.objects, 'author'),
+        (User, 'followers_count', Subscription.objects, 'author'),
+    )
+
+
+def change_counter(queryset, field, delta, **fields):
+    """
+    Атомарно меняет счётчик field у строк queryset на delta и
+    в том же запросе записывает значения fields.
+    """
+    if delta > 0:
+        value = F(field) + delta
+    else:
+        value = Greatest(F(field) + delta, Value(0))
+    return queryset.update(**{field: value}, **fields)
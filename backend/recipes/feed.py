@@ -0,0 +1,132 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
+
+from core.cache import bump_version_on_commit, get_versions
+from users.models import Subscription
+from .models import Recipe
+
+FEED_KEY = 'feed:{user_id}'
+AUTHOR_FEED_KEY = 'feed:author:{author_id}:{version}'
+AUTHOR_NAMESPACE = 'feed_author:{author_id}'
+
+
+def author_versions(author_ids):
+    """Версии начала ленты авторов: {id автора: версия}."""
+    namespaces = {
+        AUTHOR_NAMESPACE.format(author_id=author_id): author_id
+        for author_id in author_ids
+    }
+    return {
+        namespaces[namespace]: version
+        for namespace, version in get_versions(namespaces).items()
+    }
+
+
+def author_heads(versions):
+    """
+    Последние FEED_HEAD_SIZE рецептов каждого автора в версиях
+    versions: списки (pub_date, id) по убыванию. Недостающие в кэше
+    авторы выбираются одним запросом.
+    """
+    keys = {
+        AUTHOR_FEED_KEY.format(author_id=author_id, version=version): (
+            author_id
+        )
+        for author_id, version in versions.items()
+    }
+    heads = {
+        keys[key]: head for key, head in cache.get_many(keys).items()
+    }
+    missing = [author_id for author_id in versions if author_id not in heads]
+    if missing:
+        loaded = {author_id: [] for author_id in missing}
+        for recipe in Recipe.objects.using(DEFAULT_DB_ALIAS).filter(
+            author__in=missing
+        ).first_per_author(settings.FEED_HEAD_SIZE):
+            loaded[recipe.author_id].append((recipe.pub_date, recipe.id))
+        cache.set_many(
+            {
+                AUTHOR_FEED_KEY.format(
+                    author_id=author_id, version=versions[author_id]
+                ): head
+                for author_id, head in loaded.items()
+            },
+            timeout=settings.FEED_CACHE_TIMEOUT,
+        )
+        heads.update(loaded)
+    return heads.values()
+
+
+def get_feed_head(user_id):
+    """
+    Начало ленты пользователя: последние FEED_HEAD_SIZE рецептов
+    авторов, на которых он подписан, списком (pub_date, id).
+
+    Лента собирается слиянием уже упорядоченных списков авторов,
+    поэтому база не сортирует рецепты всех подписок на каждый запрос.
+    Вместе с лентой хранятся версии авторов, из которых она собрана:
+    публикация автора сдвигает только его версию, а лента подписчика
+    пересобирается при чтении, если какая-то версия изменилась.
+    """
+    key = FEED_KEY.format(user_id=user_id)
+    cached = cache.get(key)
+    if cached is not None:
+        versions, head = cached
+        author_ids = versions.keys()
+        if author_versions(author_ids) == versions:
+            return head
+    else:
+        author_ids = Subscription.objects.using(DEFAULT_DB_ALIAS).filter(
+            user_id=user_id
+        ).values_list('author_id', flat=True)
+    versions = author_versions(author_ids)
+    head = list(islice(
+        heapq.merge(*author_heads(versions), reverse=True),
+        settings.FEED_HEAD_SIZE,
+    ))
+    cache.set(key, (versions, head), timeout=settings.FEED_CACHE_TIMEOUT)
+    return head
+
+
+def get_feed_page(user_id, after, limit):
+    """
+    Страница ленты после позиции after (pub_date, id) или с начала.
+    Возвращает limit + 1 позицию, чтобы понять, есть ли следующая
+    страница. Дальше начала ленты рецепты выбираются из базы.
+    """
+    head = get_feed_head(user_id)
+    page = [
+        position for position in head if after is None or position < after
+    ][:limit + 1]
+    if len(page) > limit or len(head) < settings.FEED_HEAD_SIZE:
+        return page
+    last = page[-1] if page else after
+    recipes = Recipe.objects.filter(author__subscribing__user_id=user_id)
+    if last is not None:
+        pub_date, recipe_id = last
+        recipes = recipes.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=recipe_id)
+        )
+    return page + list(recipes.order_by('-pub_date', '-id').values_list(
+        'pub_date', 'id'
+    )[:limit + 1 - len(page)])
+
+
+def author_published(author_id):
+    """
+    Сдвигает версию начала ленты автора после транзакции. Ленты
+    подписчиков не трогаются и пересобираются при следующем чтении.
+    """
+    bump_version_on_commit(AUTHOR_NAMESPACE.format(author_id=author_id))
+
+
+def subscriptions_changed(user_id):
+    """Сбрасывает ленту пользователя после транзакции."""
+    transaction.on_commit(
+        lambda: cache.delete(FEED_KEY.format(user_id=user_id))
+    )
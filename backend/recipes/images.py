@@ -0,0 +1,194 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import features
+
+from core.cache import RECIPES_NAMESPACE, bump_version
+from .snapshots import delete_snapshots
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIRECTORY = 'recipes/images/variants'
+SAVE_OPTIONS = {
+    'jpeg': {'format': 'JPEG', 'optimize': True, 'progressive': True},
+    'webp': {'format': 'WEBP', 'method': 4},
+    'avif': {'format': 'AVIF'},
+}
+SUPPORTED_FORMATS = frozenset(
+    name for name in SAVE_OPTIONS
+    if name == 'jpeg' or name in features.get_supported()
+)
+
+
+def get_formats():
+    """
+    Форматы из RECIPE_IMAGE_FORMATS, которые поддерживает Pillow.
+    Поддержка проверяется один раз при импорте: например, Pillow 10
+    не умеет сохранять AVIF.
+    """
+    return tuple(
+        name for name in settings.RECIPE_IMAGE_FORMATS
+        if name in SUPPORTED_FORMATS
+    )
+
+
+def make_variants(recipe_id, image_name):
+    """
+    Создаёт уменьшенные копии картинки всех размеров и форматов.
+
+    Возвращает словарь {размер: {формат: имя файла в хранилище}}
+    и имя исходного файла под ключом 'source'.
+    """
+    from PIL import Image, ImageOps
+
+    with default_storage.open(image_name, 'rb') as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    stem = f'{recipe_id}_{os.path.splitext(os.path.basename(image_name))[0]}'
+    variants = {'source': image_name}
+    for size, max_side in settings.RECIPE_IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        variants[size] = {}
+        for extension in get_formats():
+            converted = resized
+            if extension == 'jpeg' and resized.mode != 'RGB':
+                converted = resized.convert('RGB')
+            buffer = io.BytesIO()
+            converted.save(
+                buffer,
+                quality=settings.RECIPE_IMAGE_QUALITY,
+                **SAVE_OPTIONS[extension],
+            )
+            variants[size][extension] = default_storage.save(
+                f'{VARIANTS_DIRECTORY}/{stem}_{size}.{extension}',
+                ContentFile(buffer.getvalue()),
+            )
+    return variants
+
+
+def variant_files(variants):
+    return {
+        name
+        for size, files in variants.items() if size != 'source'
+        for name in files.values()
+    }
+
+
+def delete_variants(variants, keep=None):
+    for name in variant_files(variants) - variant_files(keep or {}):
+        default_storage.delete(name)
+
+
+def process_recipe_image(recipe_id, image_name):
+    """
+    Создаёт варианты картинки рецепта и сохраняет их в image_variants.
+
+    Если пока шла обработка картинку рецепта заменили или рецепт удалили,
+    созданные файлы удаляются.
+    """
+    from .models import Recipe
+
+    try:
+        variants = make_variants(recipe_id, image_name)
+        previous = Recipe.objects.filter(pk=recipe_id).values_list(
+            'image_variants', flat=True
+        ).first()
+        updated = Recipe.objects.filter(
+            pk=recipe_id, image=image_name
+        ).update(image_variants=variants)
+        if updated:
+            bump_version(RECIPES_NAMESPACE)
+            delete_snapshots([recipe_id])
+            delete_variants(previous or {}, keep=variants)
+        else:
+            delete_variants(variants)
+    except Exception:
+        logger.exception(
+            'Не удалось обработать картинку рецепта %s', recipe_id
+        )
+
+
+class ImageProcessor:
+    """Пул потоков, в котором обрабатываются картинки рецептов."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.executor = None
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=settings.RECIPE_IMAGE_WORKERS,
+                    thread_name_prefix='recipe-images',
+                )
+            return self.executor
+
+    def run(self, recipe_id, image_name):
+        try:
+            process_recipe_image(recipe_id, image_name)
+        finally:
+            connections.close_all()
+
+    def schedule(self, recipe):
+        """
+        Ставит обработку картинки в очередь после фиксации транзакции.
+        При RECIPE_IMAGE_WORKERS = 0 картинка обрабатывается сразу.
+        """
+        recipe_id, image_name = recipe.pk, recipe.image.name
+        if not settings.RECIPE_IMAGE_WORKERS:
+            transaction.on_commit(
+                lambda: process_recipe_image(recipe_id, image_name)
+            )
+            return
+        transaction.on_commit(
+            lambda: self.get_executor().submit(
+                self.run, recipe_id, image_name
+            )
+        )
+
+
+image_processor = ImageProcessor()
+
+
+def variant_name(recipe, size):
+    """
+    Имя файла варианта картинки в первом доступном формате
+    или исходной картинки, если варианты ещё не готовы.
+    """
+    files = (recipe.image_variants or {}).get(size)
+    if files and recipe.image_variants.get('source') == recipe.image.name:
+        for extension in get_formats():
+            if extension in files:
+                return files[extension]
+    return recipe.image.name
+
+
+def variant_urls(recipe):
+    """
+    Ссылки на варианты картинки: {размер: {формат: ссылка}}.
+    Выводятся только форматы, которые сейчас поддерживаются.
+    """
+    variants = recipe.image_variants or {}
+    if variants.get('source') != recipe.image.name:
+        return {}
+    formats = get_formats()
+    return {
+        size: {
+            extension: default_storage.url(name)
+            for extension, name in files.items()
+            if extension in formats
+        }
+        for size, files in variants.items()
+        if size != 'source'
+    }
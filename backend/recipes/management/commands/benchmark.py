@@ -0,0 +1,228 @@
+import base64
+import json
+import math
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from users.models import User
+from ...models import Ingredient, Recipe, Tag
+from .seed_bench import BENCH_EMAIL, BENCH_PREFIX, bench_image, letters
+
+SCENARIOS = (
+    'recipes-list',
+    'recipes-retrieve',
+    'recipes-create',
+    'subscriptions',
+    'ingredients-search',
+    'download-shopping-cart',
+)
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True, text=True, cwd=settings.BASE_DIR,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    """Нагрузочный тест API рецептов через тестовый клиент Django."""
+
+    help = ('Замеряет задержки и число SQL-запросов основных эндпоинтов: '
+            '"python manage.py benchmark --output bench.json". '
+            'Данные создаются командой seed_bench.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Число запросов в каждом сценарии.')
+        parser.add_argument('--warmup', type=int, default=10,
+                            help='Число запросов прогрева, не входящих в '
+                                 'результат.')
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                            help='Сценарий; можно указать несколько раз. '
+                                 'По умолчанию выполняются все.')
+        parser.add_argument('--email',
+                            default=BENCH_EMAIL.format(prefix=BENCH_PREFIX,
+                                                       number=0),
+                            help='Пользователь, от имени которого идут '
+                                 'запросы.')
+        parser.add_argument('--page-size', type=int, default=6,
+                            help='Размер страницы списков.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Зерно генератора случайных чисел.')
+        parser.add_argument('--output',
+                            help='Файл для отчёта в JSON. По умолчанию '
+                                 'отчёт выводится в консоль.')
+        parser.add_argument('--baseline',
+                            help='Отчёт предыдущего запуска для сравнения.')
+
+    def handle(self, *args, **options):
+        try:
+            self.user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["email"]} не найден: '
+                'выполните "python manage.py seed_bench"'
+            )
+        self.random = random.Random(options['seed'])
+        self.page_size = options['page_size']
+        self.recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        self.tag_ids = list(Tag.objects.values_list('id', flat=True))
+        self.ingredients = list(Ingredient.objects.values_list('id', 'name'))
+        if not (self.recipe_ids and self.tag_ids and self.ingredients):
+            raise CommandError('Нет рецептов, тегов или ингредиентов')
+        self.image = 'data:image/jpeg;base64,' + base64.b64encode(
+            bench_image()
+        ).decode()
+        self.created = []
+        token, _ = Token.objects.get_or_create(user=self.user)
+        host = next(
+            (host for host in settings.ALLOWED_HOSTS if host != '*'),
+            'localhost',
+        ).lstrip('.')
+        self.client = Client(
+            HTTP_HOST=host, HTTP_AUTHORIZATION=f'Token {token.key}'
+        )
+        report = {
+            'commit': current_commit(),
+            'database': connection.vendor,
+            'started': datetime.now(timezone.utc).isoformat(),
+            'requests': options['requests'],
+            'recipes': len(self.recipe_ids),
+            'scenarios': {},
+        }
+        try:
+            for name in options['scenario'] or SCENARIOS:
+                scenario = getattr(self, name.replace('-', '_'))
+                for _ in range(options['warmup']):
+                    self.measure(scenario)
+                report['scenarios'][name] = self.summarize([
+                    self.measure(scenario)
+                    for _ in range(options['requests'])
+                ])
+        finally:
+            for recipe in Recipe.objects.filter(id__in=self.created):
+                recipe.image.delete(save=False)
+                recipe.delete()
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+        if options['baseline']:
+            self.compare(report, options['baseline'])
+
+    def measure(self, scenario):
+        method, path, data = scenario()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            if method == 'post':
+                response = self.client.post(
+                    path, json.dumps(data), content_type='application/json'
+                )
+            else:
+                response = self.client.get(path, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        if method == 'post' and response.status_code == 201:
+            self.created.append(response.json()['id'])
+        return elapsed, len(queries), response.status_code
+
+    def summarize(self, results):
+        latencies = [elapsed * 1000 for elapsed, _, _ in results]
+        queries = [count for _, count, _ in results]
+        return {
+            'errors': sum(status >= 400 for _, _, status in results),
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies), 2),
+                'p50': round(percentile(latencies, 50), 2),
+                'p95': round(percentile(latencies, 95), 2),
+                'p99': round(percentile(latencies, 99), 2),
+                'max': round(max(latencies), 2),
+            },
+            'queries': {
+                'mean': round(sum(queries) / len(queries), 2),
+                'max': max(queries),
+            },
+            'throughput_rps': round(len(latencies) * 1000 / sum(latencies), 1),
+        }
+
+    def compare(self, report, path):
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)
+        self.stdout.write(
+            f'Сравнение с {baseline.get("commit") or path}:'
+        )
+        for name, current in report['scenarios'].items():
+            previous = baseline['scenarios'].get(name)
+            if previous is None:
+                continue
+            before = previous['latency_ms']['p95']
+            after = current['latency_ms']['p95']
+            change = (after - before) / before * 100 if before else 0
+            style = self.style.ERROR if change > 10 else self.style.SUCCESS
+            self.stdout.write(style(
+                f'{name}: p95 {before} -> {after} мс ({change:+.0f}%), '
+                f'запросов {previous["queries"]["mean"]} -> '
+                f'{current["queries"]["mean"]}'
+            ))
+
+    def recipes_list(self):
+        return 'get', '/api/recipes/', {
+            'page': self.random.randint(1, 5), 'limit': self.page_size
+        }
+
+    def recipes_retrieve(self):
+        recipe_id = self.random.choice(self.recipe_ids)
+        return 'get', f'/api/recipes/{recipe_id}/', {}
+
+    def recipes_create(self):
+        ingredients = self.random.sample(
+            self.ingredients, min(5, len(self.ingredients))
+        )
+        return 'post', '/api/recipes/', {
+            'name': f'Бенчмарк {letters(len(self.created))} '
+                    f'{letters(self.random.getrandbits(32))}',
+            'text': 'Рецепт, созданный нагрузочным тестом.',
+            'cooking_time': self.random.randint(5, 180),
+            'image': self.image,
+            'tags': self.random.sample(self.tag_ids, 1),
+            'ingredients': [
+                {'id': ingredient_id, 'amount': self.random.randint(1, 500)}
+                for ingredient_id, _ in ingredients
+            ],
+        }
+
+    def subscriptions(self):
+        return 'get', '/api/users/subscriptions/', {
+            'limit': self.page_size, 'recipes_limit': 3
+        }
+
+    def ingredients_search(self):
+        _, name = self.random.choice(self.ingredients)
+        return 'get', '/api/ingredients/', {
+            'name': name[:self.random.randint(1, 3)]
+        }
+
+    def download_shopping_cart(self):
+        return 'get', '/api/recipes/download_shopping_cart/', {}
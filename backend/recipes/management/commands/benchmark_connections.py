@@ -0,0 +1,98 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.connections import check_connection
+from core.postgresql_pool.base import close_pools
+from .benchmark import percentile
+
+MODES = {
+    'connect': {'ENGINE': 'django.db.backends.postgresql', 'CONN_MAX_AGE': 0},
+    'persistent': {
+        'ENGINE': 'django.db.backends.postgresql', 'CONN_MAX_AGE': 60
+    },
+    'pool': {'ENGINE': 'core.postgresql_pool', 'CONN_MAX_AGE': 0},
+}
+
+
+class Command(BaseCommand):
+    """Стоимость установки соединения с базой на запрос."""
+
+    help = ('Сравнивает задержку цикла запроса с новым соединением, '
+            'постоянным соединением и пулом: '
+            '"python manage.py benchmark_connections --threads 4".')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Число запросов в каждом режиме.')
+        parser.add_argument('--threads', type=int, default=1,
+                            help='Число потоков, как у воркера gthread.')
+        parser.add_argument('--mode', action='append', choices=MODES,
+                            help='Режим; можно указать несколько раз. '
+                                 'По умолчанию выполняются все.')
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        per_thread = max(options['requests'] // threads, 1)
+        report = {'requests': per_thread * threads, 'threads': threads}
+        for mode in options['mode'] or MODES:
+            alias = f'benchmark_{mode}'
+            connections.databases[alias] = {
+                **connections[DEFAULT_DB_ALIAS].settings_dict,
+                **MODES[mode],
+                'POOL_SIZE': threads,
+                'POOL_TIMEOUT': 10,
+            }
+            try:
+                with ThreadPoolExecutor(threads) as executor:
+                    results = [
+                        result
+                        for thread in executor.map(
+                            lambda _: self.run(alias, per_thread),
+                            range(threads),
+                        )
+                        for result in thread
+                    ]
+            finally:
+                close_pools()
+                del connections.databases[alias]
+            report[mode] = self.summarize(results)
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+
+    def run(self, alias, requests):
+        """
+        Повторяет то, что Django делает с соединением за запрос:
+        проверку в начале, один SQL-запрос и закрытие устаревшего
+        соединения в конце.
+        """
+        connection = connections[alias]
+        results = []
+        try:
+            for _ in range(requests):
+                started = time.perf_counter()
+                check_connection(connection)
+                connection.close_if_unusable_or_obsolete()
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_backend_pid()')
+                    pid = cursor.fetchone()[0]
+                connection.close_if_unusable_or_obsolete()
+                connection.last_used = time.monotonic()
+                results.append((time.perf_counter() - started, pid))
+        finally:
+            connection.close()
+        return results
+
+    def summarize(self, results):
+        latencies = [elapsed * 1000 for elapsed, _ in results]
+        return {
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies), 3),
+                'p50': round(percentile(latencies, 50), 3),
+                'p95': round(percentile(latencies, 95), 3),
+                'max': round(max(latencies), 3),
+            },
+            'connections': len({pid for _, pid in results}),
+        }
@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...models import Recipe, RecipeSimilarity
+from ...recommendations import SimilarityModel
+from ...utils import batches
+
+
+class Command(BaseCommand):
+    """Расчёт похожих рецептов."""
+
+    help = ('Рассчитывает похожие рецепты по избранному, корзинам, '
+            'ингредиентам и тегам: "python manage.py build_recommendations".')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--outdated',
+            action='store_true',
+            help='Пересчитать только рецепты, у которых изменилось '
+                 'избранное или состав, и рецепты, для которых они '
+                 'были похожими.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Число рецептов, сохраняемых в одной транзакции.',
+        )
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=settings.RECOMMENDATIONS_TOP_K,
+            help='Число похожих рецептов у каждого рецепта.',
+        )
+        parser.add_argument(
+            '--max-df',
+            type=float,
+            default=settings.RECOMMENDATIONS_MAX_DF,
+            help='Ингредиенты, которые есть в большей доле рецептов, '
+                 'не учитываются.',
+        )
+
+    def get_recipe_ids(self, outdated):
+        if not outdated:
+            return list(Recipe.objects.order_by('pk').values_list(
+                'pk', flat=True
+            ))
+        outdated = set(Recipe.objects.filter(
+            similar_outdated=True
+        ).values_list('pk', flat=True))
+        outdated.update(RecipeSimilarity.objects.filter(
+            similar_id__in=outdated
+        ).values_list('recipe_id', flat=True))
+        return sorted(outdated)
+
+    def save(self, model, recipe_ids, top_k):
+        with transaction.atomic():
+            RecipeSimilarity.objects.filter(recipe_id__in=recipe_ids).delete()
+            RecipeSimilarity.objects.bulk_create(
+                RecipeSimilarity(
+                    recipe_id=recipe_id, similar_id=similar_id, score=score
+                )
+                for recipe_id in recipe_ids
+                for similar_id, score in model.similar(recipe_id, top_k)
+            )
+
+    def mark_outdated(self, recipe_ids, outdated, batch_size):
+        for batch in batches(recipe_ids, batch_size):
+            Recipe.objects.filter(pk__in=batch).update(
+                similar_outdated=outdated
+            )
+
+    def handle(self, *args, **options):
+        recipe_ids = self.get_recipe_ids(options['outdated'])
+        if not recipe_ids:
+            self.stdout.write(self.style.SUCCESS('Похожие рецепты актуальны'))
+            return
+        # Отметки снимаются до загрузки данных: изменение, сделанное
+        # во время расчёта, снова отметит рецепт, и следующий запуск
+        # с --outdated его пересчитает.
+        self.mark_outdated(recipe_ids, False, options['batch_size'])
+        saved = 0
+        try:
+            model = SimilarityModel(
+                settings.RECOMMENDATION_WEIGHTS, options['max_df']
+            )
+            for batch in batches(recipe_ids, options['batch_size']):
+                self.save(model, batch, options['top_k'])
+                saved += len(batch)
+        except BaseException:
+            self.mark_outdated(
+                recipe_ids[saved:], True, options['batch_size']
+            )
+            raise
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитаны похожие рецепты для {len(recipe_ids)} рецептов'
+        ))
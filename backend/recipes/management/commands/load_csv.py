@@ -1,41 +1,255 @@
+import csv
+import io
+import json
 import os
-from csv import DictReader
+import time
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
+from core.cache import INGREDIENTS_NAMESPACE, TAGS_NAMESPACE, bump_version
 from ...models import Ingredient, Tag
+from ...utils import batches
 
-DATA = [
-    (Ingredient, 'ingredients.csv'),
-    (Tag, 'tags.csv'),
-]
+JSON_CHUNK_SIZE = 64 * 1024
+JSON_MAX_RECORD_SIZE = 1024 * 1024
+
+DATA = {
+    'ingredients': (Ingredient, 'ingredients.csv', INGREDIENTS_NAMESPACE),
+    'tags': (Tag, 'tags.csv', TAGS_NAMESPACE),
+}
+
+
+def read_json_array(file):
+    """
+    Читает элементы массива JSON по одному. В памяти держится только
+    прочитанный кусок файла и текущая запись, которая не может быть
+    длиннее JSON_MAX_RECORD_SIZE символов.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position = '', 0
+
+    def next_char(required=True):
+        nonlocal buffer, position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            buffer, position = file.read(JSON_CHUNK_SIZE), 0
+            if not buffer and required:
+                raise CommandError('Файл json оборвался до конца массива')
+            if not buffer:
+                return ''
+
+    def check_end():
+        if next_char(required=False):
+            raise CommandError('Лишние данные после массива в файле json')
+
+    if next_char() != '[':
+        raise CommandError('Файл json должен содержать массив записей')
+    position += 1
+    if next_char() == ']':
+        position += 1
+        check_end()
+        return
+    while True:
+        next_char()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                end = None
+            if end is not None and end < len(buffer) and (
+                    buffer[end] in ',]' or buffer[end].isspace()):
+                break
+            chunk = file.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                if end is None:
+                    raise CommandError('Неверная запись в файле json')
+                break
+            buffer, position = buffer[position:] + chunk, 0
+            if len(buffer) > JSON_MAX_RECORD_SIZE + JSON_CHUNK_SIZE:
+                raise CommandError(
+                    'Запись в файле json длиннее '
+                    f'{JSON_MAX_RECORD_SIZE} символов'
+                )
+        yield value
+        position = end
+        char = next_char()
+        position += 1
+        if char == ']':
+            check_end()
+            return
+        if char != ',':
+            raise CommandError('Неверный разделитель в файле json')
+
+
+def read_rows(path):
+    """
+    Читает записи из файла csv, json или jsonl. Файлы читаются
+    построчно или, для json, по одному элементу массива.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, 'r', encoding='utf-8') as file:
+        if extension == '.csv':
+            yield from csv.DictReader(file)
+        elif extension == '.jsonl':
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        elif extension == '.json':
+            yield from read_json_array(file)
+        else:
+            raise CommandError(f'Неизвестный формат файла "{path}"')
 
 
 class Command(BaseCommand):
-    """Импорт данных из csv-файлов"""
+    """Импорт справочников из файлов csv, json и jsonl."""
 
     help = ('Чтобы запустить импорт данных из csv-файлов, '
-            'выполните команду "python manage.py load_csv".')
+            'выполните команду "python manage.py load_csv". '
+            'Файлы можно задать параметрами --ingredients и --tags.')
+
+    def add_arguments(self, parser):
+        for name, (model, filename, _) in DATA.items():
+            parser.add_argument(
+                f'--{name}',
+                default=os.path.join(settings.BASE_DIR, 'data', filename),
+                help=f'Файл с данными модели {model.__name__} '
+                     '(csv, json или jsonl).',
+            )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Число записей в одном запросе на вставку.',
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Загружать через COPY во временную таблицу (PostgreSQL).',
+        )
+        parser.add_argument(
+            '--validate',
+            action='store_true',
+            help='Проверять записи валидаторами полей модели.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Проверить и вставить данные, затем откатить транзакцию.',
+        )
 
-    def handle(self, *args, **kwargs):
-        for model, filename in DATA:
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше 0')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy доступен только для PostgreSQL')
+        for name, (model, _, namespace) in DATA.items():
+            path = options[name]
             try:
-                file = os.path.join(settings.BASE_DIR, 'data', filename)
-                with open(file, 'r', encoding='utf-8') as csv_file:
-                    for data in DictReader(csv_file):
-                        try:
-                            model.objects.bulk_create([model(**data)])
-                        except ValueError as error:
-                            self.stdout.write(self.style.ERROR(
-                                'Ошибка при загрузке данных'
-                                f'для модели "{model.__name__}": {error}'
-                            ))
-                    self.stdout.write(self.style.SUCCESS(
-                        f'Данные для модели "{model.__name__}" '
-                        f'успешно загружены'
-                    ))
+                self.load(model, path, options)
             except FileNotFoundError:
                 self.stdout.write(self.style.ERROR(
-                    f'Файл "{filename}" не найден'
+                    f'Файл "{path}" не найден'
                 ))
+                continue
+            if not options['dry_run']:
+                bump_version(namespace)
+
+    def check_row(self, model, fields, data):
+        for name in fields:
+            value = data.get(name)
+            if value is None or str(value).strip() == '':
+                raise ValidationError({name: 'Поле не заполнено.'})
+            max_length = model._meta.get_field(name).max_length
+            if max_length and len(str(value)) > max_length:
+                raise ValidationError(
+                    {name: f'Длина больше {max_length} символов.'}
+                )
+
+    def clean(self, model, fields, rows, stats, validate):
+        for number, data in enumerate(rows, stats['read'] + 1):
+            stats['read'] += 1
+            try:
+                self.check_row(model, fields, data)
+                instance = model(**{field: data[field] for field in fields})
+                if validate:
+                    instance.clean_fields()
+            except ValidationError as error:
+                self.reject(model, number, error.message_dict, stats)
+            else:
+                yield instance
+
+    def reject(self, model, number, error, stats):
+        stats['rejected'] += 1
+        self.stdout.write(self.style.ERROR(
+            f'Ошибка при загрузке данных для модели "{model.__name__}", '
+            f'запись {number}: {error}'
+        ))
+
+    def insert(self, model, fields, instances, use_copy):
+        if not use_copy:
+            model.objects.bulk_create(instances, ignore_conflicts=True)
+            return
+        table = connection.ops.quote_name(model._meta.db_table)
+        temporary_table = connection.ops.quote_name(
+            f'import_{model._meta.db_table}'
+        )
+        columns = ', '.join(
+            connection.ops.quote_name(model._meta.get_field(field).column)
+            for field in fields
+        )
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for instance in instances:
+            writer.writerow(getattr(instance, field) for field in fields)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE IF NOT EXISTS {temporary_table} '
+                f'ON COMMIT DROP AS SELECT {columns} FROM {table} '
+                'WITH NO DATA'
+            )
+            cursor.execute(f'TRUNCATE {temporary_table}')
+            cursor.copy_expert(
+                f'COPY {temporary_table} ({columns}) FROM STDIN '
+                'WITH (FORMAT csv)',
+                buffer,
+            )
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT {columns} FROM {temporary_table} '
+                'ON CONFLICT DO NOTHING'
+            )
+
+    def load(self, model, path, options):
+        fields = [
+            field.name for field in model._meta.concrete_fields
+            if not field.primary_key
+        ]
+        stats = {'read': 0, 'rejected': 0}
+        started = time.monotonic()
+        with transaction.atomic():
+            before = model.objects.count()
+            rows = self.clean(
+                model, fields, read_rows(path), stats, options['validate']
+            )
+            for batch in batches(rows, options['batch_size']):
+                self.insert(model, fields, batch, options['copy'])
+            stats['inserted'] = model.objects.count() - before
+            if options['dry_run']:
+                transaction.set_rollback(True)
+        elapsed = time.monotonic() - started
+        skipped = stats['read'] - stats['rejected'] - stats['inserted']
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные для модели "{model.__name__}" '
+            f'{"проверены" if options["dry_run"] else "успешно загружены"}: '
+            f'прочитано {stats["read"]}, добавлено {stats["inserted"]}, '
+            f'уже были {skipped}, отклонено {stats["rejected"]} '
+            f'за {elapsed:.2f} с ({stats["read"] / max(elapsed, 1e-6):.0f} '
+            'записей/с)'
+        ))
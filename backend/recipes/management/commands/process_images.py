@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from ...images import process_recipe_image
+from ...models import Recipe
+
+
+class Command(BaseCommand):
+    """Создание уменьшенных копий картинок рецептов."""
+
+    help = ('Создаёт уменьшенные копии картинок рецептов, у которых их '
+            'ещё нет: "python manage.py process_images".')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать копии картинок всех рецептов.',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').only(
+            'id', 'image', 'image_variants'
+        )
+        processed = 0
+        for recipe in recipes.iterator():
+            if (options['all'] or recipe.image_variants.get('source')
+                    != recipe.image.name):
+                process_recipe_image(recipe.pk, recipe.image.name)
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {processed}'
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from ...counters import count_subquery, get_counters
+
+
+class Command(BaseCommand):
+    """Пересчёт счётчиков избранного, корзин, рецептов и подписчиков."""
+
+    help = ('Пересчитывает денормализованные счётчики и исправляет '
+            'расхождения: "python manage.py recount_counters".')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать число расхождений, ничего не меняя.',
+        )
+
+    def handle(self, *args, **options):
+        for model, field, related, relation in get_counters():
+            actual = count_subquery(related, relation)
+            with transaction.atomic():
+                drifted = model.objects.annotate(actual=actual).exclude(
+                    **{field: F('actual')}
+                ).count()
+                if drifted and not options['dry_run']:
+                    model.objects.update(**{field: actual})
+            style = self.style.WARNING if drifted else self.style.SUCCESS
+            self.stdout.write(style(
+                f'{model.__name__}.{field}: расхождений {drifted}'
+            ))
@@ -0,0 +1,229 @@
+import io
+import random
+import time
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.cache import RECIPE_INGREDIENTS_NAMESPACE, bump_version
+from users.models import Subscription, User
+from ...models import Ingredient, Recipe, RecipeIngredient, Tag
+from ...utils import batches
+
+BENCH_PREFIX = 'bench'
+BENCH_EMAIL = '{prefix}{number}@example.com'
+BENCH_IMAGE = 'recipes/images/bench.jpg'
+BENCH_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+RECIPE_WORDS = (
+    ('Пирог', 'Суп', 'Салат', 'Рагу', 'Омлет', 'Плов', 'Пудинг', 'Соус'),
+    ('домашний', 'быстрый', 'острый', 'летний', 'сытный', 'лёгкий'),
+    ('с грибами', 'с курицей', 'с сыром', 'с овощами', 'с ягодами'),
+)
+
+
+def letters(number):
+    """Записывает число буквами: названия рецептов не допускают цифр."""
+    result = ''
+    while True:
+        number, rest = divmod(number, 26)
+        result = chr(ord('a') + rest) + result
+        if not number:
+            return result
+        number -= 1
+
+
+def zipf_weights(size, exponent):
+    """Накопленные веса распределения Ципфа для random.choices."""
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)
+    ))
+
+
+def bench_image():
+    """Небольшая картинка-заглушка в формате JPEG."""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), (226, 108, 45)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    """Генерация синтетических данных для нагрузочных тестов."""
+
+    help = ('Создаёт пользователей, рецепты, избранное, корзины и подписки '
+            'для бенчмарка: "python manage.py seed_bench --users 1000".')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000,
+                            help='Число пользователей.')
+        parser.add_argument('--recipes', type=int, default=10000,
+                            help='Число рецептов.')
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8,
+                            help='Наибольшее число ингредиентов в рецепте.')
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Число избранных рецептов у пользователя.')
+        parser.add_argument('--carts', type=int, default=5,
+                            help='Число рецептов в корзине у пользователя.')
+        parser.add_argument('--subscriptions', type=int, default=10,
+                            help='Число подписок у пользователя.')
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Показатель распределения популярности.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Зерно генератора случайных чисел.')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Число записей в одном запросе на вставку.')
+        parser.add_argument('--password', default='bench-password',
+                            help='Пароль всех созданных пользователей.')
+        parser.add_argument('--prefix', default=BENCH_PREFIX,
+                            help='Префикс юзернеймов и email.')
+        parser.add_argument('--clear', action='store_true',
+                            help='Удалить ранее созданные данные бенчмарка.')
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('Нужно не меньше 2 пользователей и 1 рецепта')
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError(
+                'Нет ингредиентов: выполните "python manage.py load_csv"'
+            )
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.exponent = options['zipf']
+        prefix = options['prefix']
+        existing = User.objects.filter(username__startswith=prefix)
+        started = time.monotonic()
+        with transaction.atomic():
+            if options['clear']:
+                existing.delete()
+            elif existing.exists():
+                raise CommandError(
+                    f'Пользователи с префиксом "{prefix}" уже есть: '
+                    'добавьте --clear'
+                )
+            tag_ids = self.get_tags()
+            user_ids = self.create_users(options)
+            recipe_ids = self.create_recipes(options, user_ids, tag_ids,
+                                             ingredient_ids)
+            self.create_relations(options, user_ids, recipe_ids)
+        bump_version(RECIPE_INGREDIENTS_NAMESPACE)
+        call_command('recount_counters', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Созданы {len(user_ids)} пользователей и {len(recipe_ids)} '
+            f'рецептов за {time.monotonic() - started:.1f} с'
+        ))
+
+    def bulk_create(self, model, objects):
+        created = 0
+        for batch in batches(objects, self.batch_size):
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            created += len(batch)
+        self.stdout.write(f'{model._meta.db_table}: {created}')
+
+    def popular(self, population, weights, count):
+        """Выбирает до count разных элементов с учётом популярности."""
+        chosen = self.random.choices(population, cum_weights=weights, k=count)
+        return dict.fromkeys(chosen)
+
+    def get_tags(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in BENCH_TAGS
+            )
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_users(self, options):
+        password = make_password(options['password'])
+        prefix = options['prefix']
+        self.bulk_create(User, (
+            User(
+                username=f'{prefix}{number}',
+                email=BENCH_EMAIL.format(prefix=prefix, number=number),
+                first_name='Бенчмарк',
+                last_name=f'Пользователь {number}',
+                password=password,
+            )
+            for number in range(options['users'])
+        ))
+        return list(User.objects.filter(
+            username__startswith=prefix
+        ).order_by('id').values_list('id', flat=True))
+
+    def create_recipes(self, options, user_ids, tag_ids, ingredient_ids):
+        if not default_storage.exists(BENCH_IMAGE):
+            default_storage.save(BENCH_IMAGE, ContentFile(bench_image()))
+        authors = self.random.choices(
+            user_ids,
+            cum_weights=zipf_weights(len(user_ids), self.exponent),
+            k=options['recipes'],
+        )
+        self.bulk_create(Recipe, (
+            Recipe(
+                author_id=author_id,
+                name=' '.join(
+                    self.random.choice(words) for words in RECIPE_WORDS
+                ) + f' {letters(number)}',
+                image=BENCH_IMAGE,
+                text='Рецепт для нагрузочного тестирования.',
+                cooking_time=self.random.randint(5, 180),
+            )
+            for number, author_id in enumerate(authors)
+        ))
+        recipe_ids = list(Recipe.objects.filter(
+            author_id__in=user_ids
+        ).order_by('id').values_list('id', flat=True))
+        self.bulk_create(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.random.sample(
+                tag_ids, self.random.randint(1, min(3, len(tag_ids)))
+            )
+        ))
+        ingredients = zipf_weights(len(ingredient_ids), self.exponent)
+        self.bulk_create(RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=self.random.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in self.popular(
+                ingredient_ids,
+                ingredients,
+                self.random.randint(1, options['ingredients_per_recipe']),
+            )
+        ))
+        Recipe.objects.filter(author_id__in=user_ids).update_search_vector()
+        return recipe_ids
+
+    def create_relations(self, options, user_ids, recipe_ids):
+        recipes = zipf_weights(len(recipe_ids), self.exponent)
+        authors = zipf_weights(len(user_ids), self.exponent)
+        for model, count in (
+            (User.favorite_recipes.through, options['favorites']),
+            (User.shopping_cart_recipes.through, options['carts']),
+        ):
+            self.bulk_create(model, (
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in self.popular(recipe_ids, recipes, count)
+            ))
+        self.bulk_create(Subscription, (
+            Subscription(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in self.popular(
+                user_ids, authors, options['subscriptions']
+            )
+            if author_id != user_id
+        ))
@@ -0,0 +1,152 @@
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from core.cache import (RECIPE_INGREDIENTS_NAMESPACE, get_changes,
+                        get_version, record_change)
+from .models import RecipeIngredient
+
+MAX_REPLAY = 1000
+
+
+class RankedMatches:
+    """
+    Рецепты, подходящие под набор ингредиентов, в порядке ранжирования.
+
+    Список упорядочивается только на нужную длину среза, поэтому
+    пагинатор выбирает страницу без полной сортировки.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop, _ = key.indices(len(self.entries))
+        return [
+            (-recipe_id, missing, -score)
+            for missing, score, recipe_id
+            in heapq.nsmallest(stop, self.entries)[start:]
+        ]
+
+
+class RecipeMatcher:
+    """
+    Обратный индекс «ингредиент → рецепты» для подбора рецептов
+    по имеющимся ингредиентам.
+
+    Для каждого ингредиента хранится отсортированный массив id рецептов,
+    для каждого рецепта — массив id его ингредиентов. Изменённые рецепты
+    записываются в журнал версий в кэше, и каждый процесс догружает
+    только их; если журнал неполон, индекс строится заново.
+
+    Индекс не меняется на месте: обновление собирает новые словари,
+    копируя только затронутые массивы, и публикует их одним кортежем,
+    поэтому match читает без блокировки согласованное состояние.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.index = ({}, {})
+
+    def build(self, version):
+        recipes = defaultdict(lambda: array('I'))
+        postings = defaultdict(lambda: array('I'))
+        rows = RecipeIngredient.objects.using(DEFAULT_DB_ALIAS).order_by(
+            'recipe_id', 'ingredient_id'
+        ).values_list('recipe_id', 'ingredient_id')
+        for recipe_id, ingredient_id in rows.iterator(chunk_size=10000):
+            recipes[recipe_id].append(ingredient_id)
+            postings[ingredient_id].append(recipe_id)
+        self.index = (dict(recipes), dict(postings))
+        self.version = version
+
+    def apply(self, recipe_ids, version):
+        rows = RecipeIngredient.objects.using(DEFAULT_DB_ALIAS).filter(
+            recipe_id__in=recipe_ids
+        ).order_by('ingredient_id').values_list('recipe_id', 'ingredient_id')
+        recipes, postings = (dict(part) for part in self.index)
+        copied = set()
+
+        def posting(ingredient_id):
+            if ingredient_id not in copied:
+                copied.add(ingredient_id)
+                postings[ingredient_id] = array(
+                    'I', postings.get(ingredient_id, ())
+                )
+            return postings[ingredient_id]
+
+        for recipe_id in recipe_ids:
+            for ingredient_id in recipes.pop(recipe_id, ()):
+                ids = posting(ingredient_id)
+                del ids[bisect_left(ids, recipe_id)]
+        for recipe_id, ingredient_id in rows:
+            recipes.setdefault(recipe_id, array('I')).append(ingredient_id)
+            insort(posting(ingredient_id), recipe_id)
+        self.index = (recipes, postings)
+        self.version = version
+
+    def refresh(self):
+        version = get_version(RECIPE_INGREDIENTS_NAMESPACE)
+        if version == self.version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            changes = None
+            if self.version is not None and (
+                    0 < version - self.version <= MAX_REPLAY):
+                changes = get_changes(
+                    RECIPE_INGREDIENTS_NAMESPACE, self.version, version
+                )
+            if changes is None:
+                self.build(version)
+            else:
+                self.apply(set(changes), version)
+
+    def changed(self, recipe_id):
+        """Отмечает, что ингредиенты рецепта изменились."""
+        transaction.on_commit(
+            lambda: record_change(RECIPE_INGREDIENTS_NAMESPACE, recipe_id)
+        )
+
+    def match(self, have, max_missing=None):
+        """
+        Рецепты, в которых есть хотя бы один ингредиент из have.
+
+        Сначала идут рецепты с наименьшим числом недостающих ингредиентов,
+        при равенстве — с наибольшим коэффициентом Жаккара между
+        ингредиентами рецепта и have.
+        """
+        self.refresh()
+        recipes, postings = self.index
+        have = set(have)
+        matched = Counter()
+        for ingredient_id in have:
+            matched.update(postings.get(ingredient_id, ()))
+        entries = []
+        for recipe_id, count in matched.items():
+            ingredients = recipes.get(recipe_id)
+            if ingredients is None:
+                continue
+            size = len(ingredients)
+            missing = size - count
+            if max_missing is None or missing <= max_missing:
+                entries.append((
+                    missing,
+                    -count / (size + len(have) - count),
+                    -recipe_id,
+                ))
+        return RankedMatches(entries)
+
+
+recipe_matcher = RecipeMatcher()
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:16
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    User = apps.get_model('users', 'User')
+    for field, through in (
+        ('favorites_count', User.favorite_recipes.through),
+        ('in_carts_count', User.shopping_cart_recipes.through),
+    ):
+        Recipe.objects.update(**{field: Coalesce(Subquery(
+            through.objects.filter(recipe=OuterRef('pk')).order_by().values(
+                'recipe'
+            ).annotate(count=Count('pk')).values('count')
+        ), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_alter_recipe_name'),
+        ('users', '0003_auto_20231102_1211'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число добавлений в корзину покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
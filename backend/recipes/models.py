@@ -1,7 +1,14 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.core.exceptions import EmptyResultSet
 from django.db import models
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Subquery, TextField, Value, Window)
+from django.db.models.functions import RowNumber
 
 from core import constants
-from users.models import User
+from users.models import Subscription, User
 from . import validators
 
 
@@ -69,6 +76,81 @@ class Ingredient(models.Model):
         return f'{self.name}, {self.measurement_unit}'
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Запросы к рецептам."""
+
+    def with_user_annotations(self, user):
+        """
+        Подгружает автора, теги и ингредиенты рецептов и добавляет автору
+        флаг is_subscribed для пользователя. Флаги избранного и корзины
+        берутся из UserRelations.
+        """
+        if user.is_authenticated:
+            is_subscribed = Exists(
+                Subscription.objects.filter(user=user, author=OuterRef('pk'))
+            )
+        else:
+            is_subscribed = Value(False, output_field=BooleanField())
+        authors = User.objects.annotate(is_subscribed=is_subscribed)
+        return self.prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient'),
+            ),
+            Prefetch('author', queryset=authors),
+        )
+
+    def first_per_author(self, limit):
+        """
+        Возвращает не больше limit последних рецептов каждого автора
+        одним запросом с оконной функцией ROW_NUMBER. Для заведомо
+        пустой выборки, например без авторов, запрос не выполняется.
+        """
+        queryset = self.only(
+            'id', 'author', 'name', 'image', 'image_variants', 'cooking_time',
+            'pub_date',
+        ).annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=F('author'),
+            order_by=(F('pub_date').desc(), F('id').desc()),
+        ))
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return self.none()
+        return self.model.objects.db_manager(self.db).raw(
+            f'SELECT * FROM ({sql}) AS ranked '
+            'WHERE ranked.row_number <= %s '
+            'ORDER BY ranked.author_id, ranked.row_number',
+            (*params, limit),
+        )
+
+    def update_search_vector(self):
+        """
+        Пересчитывает поисковый вектор рецептов: название с весом A,
+        названия ингредиентов с весом B и описание с весом C.
+        """
+        ingredients = RecipeIngredient.objects.filter(
+            recipe=OuterRef('pk')
+        ).values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+        return self.update(search_vector=(
+            SearchVector(
+                'name', weight='A', config=constants.SEARCH_CONFIG
+            )
+            + SearchVector(
+                Subquery(ingredients, output_field=TextField()),
+                weight='B',
+                config=constants.SEARCH_CONFIG,
+            )
+            + SearchVector(
+                'text', weight='C', config=constants.SEARCH_CONFIG
+            )
+        ))
+
+
 class Recipe(models.Model):
     """Модель рецепта."""
 
@@ -92,6 +174,12 @@ class Recipe(models.Model):
         verbose_name='Картинка',
         help_text='Прикрепите картинку',
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии картинки',
+    )
     text = models.TextField(
         verbose_name='Описание',
         help_text='Введите описание рецепта',
@@ -112,9 +200,59 @@ class Recipe(models.Model):
         db_index=True,
         verbose_name='Дата публикации',
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число добавлений в избранное',
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число добавлений в корзину покупок',
+    )
+    similar_outdated = models.BooleanField(
+        default=True,
+        editable=False,
+        verbose_name='Нужно пересчитать похожие рецепты',
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор',
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipe_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=('cooking_time', '-pub_date'),
+                name='recipe_cook_time_pub_date_idx',
+            ),
+            models.Index(
+                fields=('-favorites_count', '-pub_date'),
+                name='recipe_popular_pub_date_idx',
+            ),
+            GinIndex(
+                fields=('search_vector',),
+                name='recipe_search_vector_idx',
+            ),
+            GinIndex(
+                fields=('name',),
+                name='recipe_name_trgm_idx',
+                opclasses=('gin_trgm_ops',),
+            ),
+            models.Index(
+                fields=('id',),
+                condition=models.Q(similar_outdated=True),
+                name='recipe_similar_outdated_idx',
+            ),
+        )
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -157,3 +295,43 @@ class RecipeIngredient(models.Model):
 
     def __str__(self):
         return f'{self.ingredient.name}: {self.amount}'
+
+
+class RecipeSimilarity(models.Model):
+    """Модель похожего рецепта, рассчитанного заранее."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar',
+        verbose_name='Рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт',
+    )
+    score = models.FloatField(
+        verbose_name='Сходство',
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'similar'),
+                name='unique_similar_recipe'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('recipe', '-score'),
+                name='similarity_recipe_score_idx',
+            ),
+        )
+        ordering = ('recipe', '-score')
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+
+    def __str__(self):
+        return f'{self.recipe_id} похож на {self.similar_id}: {self.score}'
@@ -0,0 +1,138 @@
+import heapq
+import math
+from collections import defaultdict
+
+from users.models import User
+from .models import Recipe, RecipeIngredient
+
+INTERACTIONS = (
+    (User.favorite_recipes.through, 1.0),
+    (User.shopping_cart_recipes.through, 0.5),
+)
+
+
+class SimilarityModel:
+    """
+    Разреженные матрицы «рецепт — пользователь» и «рецепт — ингредиент»
+    для расчёта сходства рецептов.
+
+    Сходство по пользователям — косинус между векторами избранного
+    и корзин, где вклад пользователя ослаблен тем сильнее, чем больше
+    у него рецептов. Сходство по ингредиентам — косинус векторов TF-IDF;
+    ингредиенты, которые есть в доле рецептов больше max_df, не
+    учитываются. Сходство по тегам — коэффициент Жаккара, оно только
+    добавляется к сходству кандидатов из первых двух матриц и
+    считается лишь для тех, кто с ним может попасть в top_k.
+    """
+
+    def __init__(self, weights, max_df):
+        self.weights = weights
+        self.max_df = max_df
+        self.load_interactions()
+        self.load_ingredients()
+        self.load_tags()
+
+    @staticmethod
+    def normalize(rows):
+        """
+        Делит строки матрицы на их длину, чтобы косинус между строками
+        был их скалярным произведением.
+        """
+        normalized = {}
+        for key, row in rows.items():
+            norm = math.sqrt(sum(weight ** 2 for _, weight in row))
+            if norm:
+                normalized[key] = [(other, weight / norm)
+                                   for other, weight in row]
+        return normalized
+
+    @staticmethod
+    def transpose(rows):
+        columns = defaultdict(list)
+        for key, row in rows.items():
+            for other, weight in row:
+                columns[other].append((key, weight))
+        return columns
+
+    def load_interactions(self):
+        interactions = defaultdict(lambda: defaultdict(float))
+        for through, weight in INTERACTIONS:
+            for user_id, recipe_id in through.objects.values_list(
+                'user_id', 'recipe_id'
+            ).iterator(chunk_size=10000):
+                interactions[user_id][recipe_id] += weight
+        users = {}
+        for user_id, recipes in interactions.items():
+            damping = 1 / math.sqrt(math.log(2 + len(recipes)))
+            users[user_id] = [
+                (recipe_id, weight * damping)
+                for recipe_id, weight in recipes.items()
+            ]
+        self.recipe_users = self.normalize(self.transpose(users))
+        self.user_recipes = self.transpose(self.recipe_users)
+
+    def load_ingredients(self):
+        recipe_ingredients = defaultdict(list)
+        for recipe_id, ingredient_id in RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator(chunk_size=10000):
+            recipe_ingredients[recipe_id].append(ingredient_id)
+        document_frequency = defaultdict(int)
+        for ingredients in recipe_ingredients.values():
+            for ingredient_id in ingredients:
+                document_frequency[ingredient_id] += 1
+        total = max(len(recipe_ingredients), 1)
+        idf = {
+            ingredient_id: math.log(total / frequency)
+            for ingredient_id, frequency in document_frequency.items()
+            if frequency <= self.max_df * total and frequency < total
+        }
+        self.recipe_ingredients = self.normalize({
+            recipe_id: [
+                (ingredient_id, idf[ingredient_id])
+                for ingredient_id in ingredients
+                if ingredient_id in idf
+            ]
+            for recipe_id, ingredients in recipe_ingredients.items()
+        })
+        self.ingredient_recipes = self.transpose(self.recipe_ingredients)
+
+    def load_tags(self):
+        self.tags = defaultdict(set)
+        for recipe_id, tag_id in Recipe.tags.through.objects.values_list(
+            'recipe_id', 'tag_id'
+        ).iterator(chunk_size=10000):
+            self.tags[recipe_id].add(tag_id)
+
+    def similar(self, recipe_id, top_k):
+        """Не больше top_k самых похожих рецептов: [(id, сходство)]."""
+        blended = defaultdict(float)
+        for name, rows, columns in (
+            ('favorites', self.recipe_users, self.user_recipes),
+            ('ingredients', self.recipe_ingredients, self.ingredient_recipes),
+        ):
+            factor = self.weights[name]
+            for column, weight in rows.get(recipe_id, ()):
+                weight *= factor
+                for other_id, other_weight in columns[column]:
+                    blended[other_id] += weight * other_weight
+        blended.pop(recipe_id, None)
+        tags = self.tags.get(recipe_id)
+        ranked = heapq.nlargest(top_k, blended.values())
+        if not tags or len(ranked) < top_k:
+            threshold = 0
+        else:
+            threshold = ranked[-1] - self.weights['tags']
+        scores = {}
+        for other_id, score in blended.items():
+            if score < threshold:
+                continue
+            other_tags = self.tags.get(other_id)
+            if tags and other_tags:
+                score += self.weights['tags'] * (
+                    len(tags & other_tags) / len(tags | other_tags)
+                )
+            scores[other_id] = score
+        return heapq.nlargest(
+            top_k, scores.items(), key=lambda item: (item[1], item[0])
+        )
@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import IntegerField, Value
+from django.utils.functional import cached_property
+
+from users.models import User
+
+RELATIONS_KEY = 'relations:{user_id}'
+RELATIONS = (
+    ('favorites', User.favorite_recipes.through),
+    ('shopping_cart', User.shopping_cart_recipes.through),
+)
+
+
+class UserRelations:
+    """
+    Множества id рецептов в избранном и в корзине пользователя.
+
+    Загружаются один раз за запрос одним запросом UNION ALL
+    и, если USER_RELATIONS_CACHE_TIMEOUT не 0, хранятся в кэше
+    между запросами. Проверка флага рецепта — поиск во множестве.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    def load(self):
+        queries = [
+            through.objects.using(DEFAULT_DB_ALIAS).filter(
+                user_id=self.user.pk
+            ).values_list(
+                'recipe_id', Value(index, output_field=IntegerField())
+            )
+            for index, (_, through) in enumerate(RELATIONS)
+        ]
+        ids = [set() for _ in RELATIONS]
+        for recipe_id, index in queries[0].union(*queries[1:], all=True):
+            ids[index].add(recipe_id)
+        return {
+            name: frozenset(recipe_ids)
+            for (name, _), recipe_ids in zip(RELATIONS, ids)
+        }
+
+    @cached_property
+    def ids(self):
+        if not self.user.is_authenticated:
+            return {name: frozenset() for name, _ in RELATIONS}
+        timeout = settings.USER_RELATIONS_CACHE_TIMEOUT
+        key = RELATIONS_KEY.format(user_id=self.user.pk)
+        ids = cache.get(key) if timeout else None
+        if ids is None:
+            ids = self.load()
+            if timeout:
+                cache.set(key, ids, timeout)
+        return ids
+
+    @property
+    def favorites(self):
+        return self.ids['favorites']
+
+    @property
+    def shopping_cart(self):
+        return self.ids['shopping_cart']
+
+
+def relations_changed(user_ids):
+    """Сбрасывает кэш связей пользователей после транзакции."""
+    keys = [RELATIONS_KEY.format(user_id=user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
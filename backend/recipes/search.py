@@ -0,0 +1,20 @@
+from django.db.models import BooleanField, FloatField, Func
+
+
+class TrigramWordSimilarity(Func):
+    """Наибольшее сходство строки со словом текста (pg_trgm)."""
+
+    function = 'WORD_SIMILARITY'
+    output_field = FloatField()
+
+
+class TrigramWordSimilar(Func):
+    """
+    Условие string <% text из pg_trgm: строка похожа на какое-то слово
+    текста. В отличие от WORD_SIMILARITY использует GIN-индекс
+    с gin_trgm_ops.
+    """
+
+    arg_joiner = ' <%% '
+    template = '%(expressions)s'
+    output_field = BooleanField()
@@ -0,0 +1,166 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from core.cache import (INGREDIENTS_NAMESPACE, RECIPE_INGREDIENTS_NAMESPACE,
+                        RECIPE_SNAPSHOTS_NAMESPACE, RECIPES_NAMESPACE,
+                        TAGS_NAMESPACE, bump_version_on_commit)
+from users.models import User
+from .counters import change_counter
+from .feed import author_published
+from .images import delete_variants, image_processor
+from .matching import recipe_matcher
+from .models import Ingredient, Recipe, Tag
+from .relations import relations_changed
+from .snapshots import drop_snapshots
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(**kwargs):
+    bump_version_on_commit(INGREDIENTS_NAMESPACE)
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_deleted(**kwargs):
+    bump_version_on_commit(RECIPE_INGREDIENTS_NAMESPACE)
+    bump_version_on_commit(RECIPE_SNAPSHOTS_NAMESPACE)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(
+            ingredients__ingredient=instance
+        ).update_search_vector()
+        bump_version_on_commit(RECIPES_NAMESPACE)
+        bump_version_on_commit(RECIPE_SNAPSHOTS_NAMESPACE)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(**kwargs):
+    bump_version_on_commit(TAGS_NAMESPACE)
+    bump_version_on_commit(RECIPES_NAMESPACE)
+    bump_version_on_commit(RECIPE_SNAPSHOTS_NAMESPACE)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(instance, **kwargs):
+    """
+    Сбрасывает кэш ответов с рецептами и готовое представление
+    рецепта после транзакции.
+    """
+    bump_version_on_commit(RECIPES_NAMESPACE)
+    drop_snapshots([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    bump_version_on_commit(RECIPES_NAMESPACE)
+    if not reverse:
+        drop_snapshots([instance.pk])
+    elif pk_set is None:
+        bump_version_on_commit(RECIPE_SNAPSHOTS_NAMESPACE)
+    else:
+        drop_snapshots(pk_set)
+
+
+def change_recipe_counter(field, sender, instance, action, reverse, pk_set):
+    """
+    Пересчитывает счётчик рецептов при изменении связи пользователей
+    с рецептами, отмечает, что похожие рецепты нужно пересчитать,
+    и сбрасывает кэш связей пользователей. Удаляемые строки выбираются
+    до удаления, чтобы учесть только реально существующие связи.
+    """
+    related = 'user_id' if reverse else 'recipe_id'
+    if action == 'post_add':
+        changed, delta = pk_set, 1
+    elif action in ('pre_remove', 'pre_clear'):
+        rows = sender.objects.filter(
+            **{'recipe' if reverse else 'user': instance}
+        )
+        if action == 'pre_remove':
+            rows = rows.filter(**{f'{related}__in': pk_set})
+        changed, delta = list(rows.values_list(related, flat=True)), -1
+    else:
+        return
+    if not changed:
+        return
+    if reverse:
+        change_counter(
+            Recipe.objects.filter(pk=instance.pk),
+            field,
+            delta * len(changed),
+            similar_outdated=True,
+        )
+    else:
+        change_counter(
+            Recipe.objects.filter(pk__in=changed),
+            field,
+            delta,
+            similar_outdated=True,
+        )
+    relations_changed(changed if reverse else (instance.pk,))
+
+
+@receiver(m2m_changed, sender=User.favorite_recipes.through)
+def favorites_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    change_recipe_counter(
+        'favorites_count', sender, instance, action, reverse, pk_set
+    )
+
+
+@receiver(m2m_changed, sender=User.shopping_cart_recipes.through)
+def shopping_cart_changed(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    change_recipe_counter(
+        'in_carts_count', sender, instance, action, reverse, pk_set
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(instance, created, **kwargs):
+    if created:
+        change_counter(
+            User.objects.filter(pk=instance.author_id), 'recipes_count', 1
+        )
+        author_published(instance.author_id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, **kwargs):
+    Recipe.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(instance, **kwargs):
+    if (instance.image
+            and instance.image_variants.get('source') != instance.image.name):
+        image_processor.schedule(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    change_counter(
+        User.objects.filter(pk=instance.author_id), 'recipes_count', -1
+    )
+    variants = instance.image_variants
+    transaction.on_commit(lambda: delete_variants(variants))
+    recipe_matcher.changed(instance.pk)
+    author_published(instance.author_id)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(instance, **kwargs):
+    change_counter(
+        Recipe.objects.filter(users_favorite_recipes=instance),
+        'favorites_count',
+        -1,
+    )
+    change_counter(
+        Recipe.objects.filter(users_shopping_cart_recipes=instance),
+        'in_carts_count',
+        -1,
+    )
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.cache import RECIPE_SNAPSHOTS_NAMESPACE, get_version, make_key
+
+SNAPSHOT_ACTIONS = ('list', 'retrieve')
+
+
+def snapshot_keys(recipe_ids, action, version=None):
+    version = version or get_version(RECIPE_SNAPSHOTS_NAMESPACE)
+    return {
+        make_key(
+            RECIPE_SNAPSHOTS_NAMESPACE,
+            'snapshot',
+            recipe_id,
+            action,
+            version=version,
+        ): recipe_id
+        for recipe_id in recipe_ids
+    }
+
+
+def get_snapshots(recipe_ids, action):
+    """Готовые байты JSON рецептов для действия action: {id: байты}."""
+    keys = snapshot_keys(recipe_ids, action)
+    return {
+        keys[key]: snapshot
+        for key, snapshot in cache.get_many(keys).items()
+    }
+
+
+def set_snapshots(snapshots, action):
+    keys = snapshot_keys(snapshots, action)
+    cache.set_many(
+        {key: snapshots[recipe_id] for key, recipe_id in keys.items()},
+        timeout=settings.RECIPE_SNAPSHOT_TIMEOUT,
+    )
+
+
+def delete_snapshots(recipe_ids):
+    version = get_version(RECIPE_SNAPSHOTS_NAMESPACE)
+    cache.delete_many([
+        key
+        for action in SNAPSHOT_ACTIONS
+        for key in snapshot_keys(recipe_ids, action, version)
+    ])
+
+
+def drop_snapshots(recipe_ids):
+    """
+    Удаляет готовые представления рецептов после фиксации транзакции,
+    чтобы их не успели собрать заново из старых данных.
+    """
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        transaction.on_commit(lambda: delete_snapshots(recipe_ids))
@@ -0,0 +1,8 @@
+from itertools import islice
+
+
+def batches(iterable, size):
+    """Разбивает iterable на списки не длиннее size."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
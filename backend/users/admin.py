@@ -13,6 +13,8 @@ class UserAdmin(admin.ModelAdmin):
         'email',
         'first_name',
         'last_name',
+        'recipes_count',
+        'followers_count',
     )
     list_display_links = ('username',)
     search_fields = ('email', 'username',)
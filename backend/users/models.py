@@ -49,6 +49,16 @@ class User(AbstractUser):
         related_name='users_shopping_cart_recipes',
         verbose_name='Рецепты в корзине покупок',
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число рецептов',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число подписчиков',
+    )
 
     class Meta:
         ordering = ('-id',)
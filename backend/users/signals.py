@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import RECIPES_NAMESPACE, bump_version_on_commit
+from recipes.counters import change_counter
+from recipes.feed import subscriptions_changed
+from recipes.models import Recipe
+from recipes.snapshots import drop_snapshots
+from .models import Subscription, User
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(instance, created, **kwargs):
+    if created:
+        change_counter(
+            User.objects.filter(pk=instance.author_id), 'followers_count', 1
+        )
+        subscriptions_changed(instance.user_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(instance, **kwargs):
+    change_counter(
+        User.objects.filter(pk=instance.author_id), 'followers_count', -1
+    )
+    subscriptions_changed(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def author_changed(instance, created, update_fields, **kwargs):
+    """
+    Сбрасывает готовые представления рецептов автора и кэш ответов
+    с рецептами, если изменились поля, которые в них выводятся.
+    """
+    if created or (update_fields and not AUTHOR_FIELDS & update_fields):
+        return
+    recipe_ids = list(
+        Recipe.objects.filter(author=instance).values_list('pk', flat=True)
+    )
+    if recipe_ids:
+        drop_snapshots(recipe_ids)
+        bump_version_on_commit(RECIPES_NAMESPACE)